@@ -25,6 +25,18 @@ from func_timeout import func_timeout, FunctionTimedOut
 import myconfig
 import similarity
 import statistics
+import signal
+import sys
+import threading
+import random
+import referenceCache
+import verdicts
+import verdictCache
+from pythonSrcUtils import astFingerprint, load_function
+from stepCounter import StepCounter, StepBudgetExceeded, OWN_DIR
+import sandbox
+from func_timeout.StoppableThread import StoppableThread
+from testSuites import get_test_suites, listSplit
 
 DEBUG = True
 
@@ -86,26 +98,34 @@ def compare_results(expected: list, predicted: list) -> str:
     return "failed"
     
 
-def try_check_condition(test_case, task_id, condType): # pre or post
+def sanitize_result(result):
+    if result != None and type(result) != bool:
+        # some proposal returns a lambda-function!! which later gives a problem at the json serialization
+        # we'll override it here:
+        result = "not a boolean value"
+    return result
+
+def run_test_case(fn, test_case, timeout:float = None):
     """
-    Run a single test-case on an AI-proposed solution. The solution is 
-    assumed to have been loaded into the memory, and is named
-    e.g. check_post_taskid, for post-condition.
+    Run a single test-case on the function fn (e.g. an AI-proposed pre-/post-condition).
+    The run is killed when it exceeds the time-out (by default myconfig.RUN_SINGLE_TESTCASE_TIMEOUT), 
+    and returns "failed", as it does when the function crashes.
     """
-    def runit(tc):
-        # the 'tc' below should be {tc}, but it works too as below, accidentally, in this case,
-        # the way eval works...
-        result = eval(f"check_{condType}_{task_id}(*tc)")
-        return result
-    
+    if timeout == None:
+        timeout = myconfig.RUN_SINGLE_TESTCASE_TIMEOUT
+    def run():
+        # func_timeout drops the exceptions that are not an Exception (e.g. a SystemExit
+        # raised by the AI code), and would return None; so, they are turned into one:
+        try:
+            return fn(*test_case)
+        except FunctionTimedOut:
+            raise
+        except BaseException as e:
+            raise RuntimeError(f"test-case raised {type(e).__name__}") from e
     try:
-        #result = eval(f"check_post_{task_id}(*test_case)")
         # run the pre/post-cond in the testcase; impose time out too:
-        result = func_timeout(myconfig.RUN_SINGLE_TESTCASE_TIMEOUT, runit, args=[test_case])
-        if result != None and type(result) != bool:
-            # some proposal returns a lambda-function!! which later gives a problem at the json serialization
-            # we'll override it here:
-            result = "not a boolean value"
+        result = func_timeout(timeout, run)
+        result = sanitize_result(result)
 
     except FunctionTimedOut:
         print(">>> An AI solution execution on a test-case is killed due to timed out.")
@@ -115,21 +135,294 @@ def try_check_condition(test_case, task_id, condType): # pre or post
         return "failed"
     return result
 
+class TestCaseTimedOut(BaseException):
+    """
+    Raised (by a timer signal) to interrupt a test-case that runs too long. It is not an 
+    Exception, so that it is not swallowed by the usual except-clauses in AI code.
+    """
+    pass
+
+# once a test-case has timed out, the signal-timer keeps going off at this interval (in
+# seconds), in case the test-case swallowed the TestCaseTimedOut:
+SIGNAL_TIMER_INTERVAL = 0.05
+
+class SignalTimer:
+    """
+    Times the test-cases that run directly in the current thread (see run_with_signal_timer).
+    When a test-case runs out of time, a SIGALRM interrupts it by raising TestCaseTimedOut.
+    AI code may swallow that, e.g. with a bare except-clause in a loop. So, the timer keeps 
+    going off (every SIGNAL_TIMER_INTERVAL) until the test-case is stopped, and the 
+    interrupted code is also traced, such that TestCaseTimedOut is raised again at its next
+    line (e.g. in the except-clause that caught it). Python removes a trace function that
+    raises; code that swallows the exception once more (nested except-clauses) is stopped
+    by one of the next alarms.
+
+    The code of the tool itself (e.g. run_with_signal_timer) is never interrupted; an alarm
+    that goes off in it is ignored.
+    """
+    def __enter__(self):
+        self.tracedFrames = []
+        self.previousHandler = signal.signal(signal.SIGALRM, self.onAlarm)
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, self.previousHandler)
+        return False
+
+    def onAlarm(self, signum, frame):
+        if frame == None or frame.f_code.co_filename.startswith(OWN_DIR):
+            return
+        sys.settrace(self.raiseTimedOut)
+        while frame != None and not frame.f_code.co_filename.startswith(OWN_DIR):
+            frame.f_trace = self.raiseTimedOut
+            frame.f_trace_lines = True
+            self.tracedFrames.append(frame)
+            frame = frame.f_back
+        raise TestCaseTimedOut()
+
+    def raiseTimedOut(self, frame, event, arg):
+        if frame.f_code.co_filename.startswith(OWN_DIR):
+            return None
+        raise TestCaseTimedOut()
+
+    def run(self, fn, test_case, timeout:float) :
+        """
+        Run fn on the test-case, interrupting it after the time-out.
+        """
+        previousTrace = sys.gettrace()
+        signal.setitimer(signal.ITIMER_REAL, timeout, SIGNAL_TIMER_INTERVAL)
+        try:
+            return fn(*test_case)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            if len(self.tracedFrames) > 0:
+                sys.settrace(previousTrace)
+                for frame in self.tracedFrames: frame.f_trace = None
+                self.tracedFrames = []
+
+def signal_timer_available() -> bool :
+    """
+    True if test-cases can be timed with a signal-timer. This is only possible in the main
+    thread, and on platforms that have SIGALRM.
+    """
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+class StepBudgetUsedUp(Exception):
+    """
+    Raised by a step-limited function (see step_limited) that exceeded its step budget.
+    """
+    pass
+
+def step_limited(fn) :
+    """
+    Wrap fn such that every call to it is stopped once it takes more than myconfig.STEP_BUDGET
+    steps (see stepCounter.py). The call then raises StepBudgetUsedUp, which, as any crash
+    of a test-case, gives "failed".
+    """
+    def limited(*args):
+        counter = StepCounter(myconfig.STEP_BUDGET)
+        try:
+            with counter:
+                result = fn(*args)
+        except StepBudgetExceeded:
+            pass
+        if counter.exceeded:
+            print(">>> An AI solution execution on a test-case is stopped as it exceeds its step budget.")
+            raise StepBudgetUsedUp()
+        return result
+    return limited
+
+def execution_stats() -> Dict :
+    """
+    Statistics on the stopping of test-cases that ran out of time: the kills and respawns of
+    sandbox processes (in the subprocess mode), the processes that survived their kill, and 
+    the threads of killed test-cases that are still running (in the thread mode).
+    """
+    S = dict(sandbox.stats)
+    S["leaked threads"] = len([ 1 for t in threading.enumerate() if isinstance(t, StoppableThread) and t.is_alive() ])
+    return S
+
+class TimeBudget:
+    """
+    The total time a candidate may spend on running its test-cases. The time of a test-case
+    is limited to what remains of the budget. A budget of None is unlimited.
+    """
+    def __init__(self, seconds:float):
+        self.deadline = None if seconds == None else time.perf_counter() + seconds
+
+    def limit(self, timeout:float) -> float :
+        """
+        The time-out to impose on the next test-case; 0 if the budget is used up.
+        """
+        if self.deadline == None: return timeout
+        return max(0, min(timeout, self.deadline - time.perf_counter()))
+
+def run_test_suite(fn, suite:list, tracker=None, timeout:float = None, budget:TimeBudget = None) -> list :
+    """
+    Run all the test-cases in the suite on the function fn, and return the results. How 
+    the test-cases are timed depends on myconfig.TEST_EXECUTION_MODE:
+       thread : every test-case runs in its own thread (func_timeout), which is killed on time-out.
+       signal : the test-cases run directly in the current thread, and a signal-timer interrupts
+                the one that runs out of time.
+       auto   : signal when possible, else thread.
+       steps  : as auto, but fn is also stopped when it exceeds its budget of steps (see step_limited).
+                The time-out stays as a backstop, e.g. for code that swallows the StepBudgetExceeded.
+       subprocess : the test-cases run in a separate worker process, which is killed on time-out
+                (see sandbox.py).
+    Either way, a test-case that times out, or crashes, gives "failed".
+
+    If a tracker (a verdicts.VerdictTracker) is given, every result is passed to it, and 
+    the remaining test-cases are skipped once the tracker says the verdict is final.
+
+    The time-out of every test-case is the given timeout (by default myconfig.RUN_SINGLE_TESTCASE_TIMEOUT),
+    further limited by the budget, if one is given. Once the budget is used up, the remaining
+    test-cases give "failed" without being run.
+    """
+    if timeout == None:
+        timeout = myconfig.RUN_SINGLE_TESTCASE_TIMEOUT
+    if budget == None:
+        budget = TimeBudget(None)
+    mode = myconfig.TEST_EXECUTION_MODE
+    if mode == "subprocess":
+        return sandbox.run_test_suite_in_sandbox(fn, suite, tracker, timeout, budget)
+    if mode == "steps":
+        fn = step_limited(fn)
+        mode = "auto"
+    if mode == "auto":
+        mode = "signal" if signal_timer_available() else "thread"
+    if mode == "signal" and len(suite) > 0:
+        return run_test_suite_with_signal_timer(fn, suite, tracker, timeout, budget)
+    results = []
+    for test_case in suite:
+        t = budget.limit(timeout)
+        results.append(run_test_case(fn, test_case, t) if t > 0 else "failed")
+        if tracker != None and tracker.add(results[-1]):
+            break
+    if len(results) < len(suite):
+        results.extend(tracker.skip(len(suite) - len(results)))
+    return results
+
+def run_test_suite_with_signal_timer(fn, suite:list, tracker, timeout:float, budget:TimeBudget) -> list :
+    results = []
+    with SignalTimer() as timer:
+        for test_case in suite:
+            t = budget.limit(timeout)
+            results.append(run_with_signal_timer(fn, test_case, timer, t) if t > 0 else "failed")
+            if tracker != None and tracker.add(results[-1]):
+                break
+    if len(results) < len(suite):
+        results.extend(tracker.skip(len(suite) - len(results)))
+    return results
+
+def run_with_signal_timer(fn, test_case, timer:SignalTimer, timeout:float) :
+    """
+    Run a single test-case on fn, interrupted by the signal-timer after the time-out. 
+    """
+    try:
+        result = timer.run(fn, test_case, timeout)
+        return sanitize_result(result)
+    except TestCaseTimedOut:
+        print(">>> An AI solution execution on a test-case is killed due to timed out.")
+        return "failed"
+    except BaseException as e:
+        # also e.g. a SystemExit raised by the AI code
+        return "failed"
+
 
-def listSplit(s:list, sep): 
+def run_reference_suite(solution, suite:list) -> tuple :
     """
-    split the list s into segments which are separated by sep
+    Run the test-cases of a suite on the reference solution. Returns the results, and the
+    time (in seconds) that the slowest test-case took.
     """
-    segments = []
-    z = []
-    for x in s:
-        if x==sep:
-            segments.append(z)
-            z = []
+    results = []
+    slowest = 0.0
+    for test_case in suite:
+        t0 = time.perf_counter()
+        results.append(solution(*test_case))
+        slowest = max(slowest, time.perf_counter() - t0)
+    return (results, slowest)
+
+def choose_timeouts(runtimes:Dict) -> Dict :
+    """
+    Choose the time-out of the test-cases of each suite, given the runtime of the slowest
+    test-case of each suite on the reference solution (see myconfig.ADAPTIVE_TIMEOUT). The 
+    candidate's total time budget is included too.
+    """
+    timeouts = {}
+    for suiteName in [ "base0", "base1", "validationSuite" ]:
+        if myconfig.ADAPTIVE_TIMEOUT:
+            t = runtimes[suiteName] * myconfig.TIMEOUT_MULTIPLIER
+            timeouts[suiteName] = min(max(t, myconfig.TIMEOUT_FLOOR), myconfig.TIMEOUT_CEILING)
+        else:
+            timeouts[suiteName] = myconfig.RUN_SINGLE_TESTCASE_TIMEOUT
+    timeouts["candidateBudget"] = myconfig.CANDIDATE_TIME_BUDGET
+    return timeouts
+
+def evaluate_candidates_clustered(candidates:list, suite_Base0:list, suite_Base1:list, suite_Validation:list, 
+                                  timeouts:Dict) -> list :
+    """
+    Evaluate the given candidates by clustering them on their behavior. Every candidate is
+    first run on a small probe subset of the test-cases, and the candidates are grouped by 
+    their results on the probes. Only the first candidate of each group (its representative)
+    is run on all the remaining test-cases. The other members are run on a few randomly 
+    sampled test-cases (spot checks); if their results agree with the representative's, 
+    they get a copy of its results (and a field "clusterOf" with its nr). If not, they are 
+    run on all test-cases themselves.
+
+    The candidates are given as a list of (U,fn,fingerprint), where U is the dictionary in
+    which the results of the candidate are put, and fn the candidate function. Returns a
+    list describing the clusters. The timeouts are as chosen by choose_timeouts; as the 
+    test-cases of different suites are mixed here, the largest time-out is used for all.
+    """
+    allTests = suite_Base0 + suite_Base1 + suite_Validation
+    N = len(allTests)
+    numOfProbes = min(myconfig.CLUSTER_PROBE_SIZE, N)
+    # the probes are spread evenly over the test-cases:
+    probes = sorted(set([ (i * N) // numOfProbes for i in range(numOfProbes) ]))
+    others = [ i for i in range(N) if not i in probes ]
+
+    timeout = max(timeouts["base0"], timeouts["base1"], timeouts["validationSuite"])
+
+    def run(fn, indices, results, budget):
+        for (i,r) in zip(indices, run_test_suite(fn, [ allTests[i] for i in indices ], None, timeout, budget)):
+            results[i] = r
+
+    clusters = {}
+    for (U,fn,fingerprint) in candidates:
+        budget = TimeBudget(timeouts["candidateBudget"])
+        results = [ None ] * N
+        run(fn, probes, results, budget)
+        key = tuple(results[i] for i in probes)
+        if not key in clusters:
+            # a new cluster, with this candidate as its representative:
+            print(f"      Running tests on candidate {U['nr']} (cluster representative)")
+            run(fn, others, results, budget)
+            clusters[key] = { "representative" : U["nr"], "size" : 1, "spotChecked" : 0, "spotCheckFailures" : 0,
+                              "results" : results }
         else:
-            z.append(x)
-    segments.append(z)
-    return segments
+            C = clusters[key]
+            C["size"] += 1
+            rnd = random.Random(U["nr"])
+            spots = sorted(rnd.sample(others, min(myconfig.CLUSTER_SPOT_CHECKS, len(others))))
+            run(fn, spots, results, budget)
+            C["spotChecked"] += 1
+            if all(results[i] == C["results"][i] for i in spots):
+                results = list(C["results"])
+                U["clusterOf"] = C["representative"]
+            else:
+                print(f"      Candidate {U['nr']} fails the spot checks of its cluster; running all tests")
+                C["spotCheckFailures"] += 1
+                run(fn, [ i for i in others if not i in spots ], results, budget)
+        n0 = len(suite_Base0)
+        n1 = n0 + len(suite_Base1)
+        U["base0"] = results[:n0]
+        U["base1"] = results[n0:n1]
+        U["validationSuite"] = results[n1:]
+
+    print(f"      {len(candidates)} candidates were clustered into {len(clusters)} clusters")
+    return [ { field : C[field] for field in [ "representative", "size", "spotChecked", "spotCheckFailures" ] } 
+             for C in clusters.values() ]
 
 def evaluate_task_result(task: Dict, condition: str):
     """
@@ -157,6 +450,7 @@ def evaluate_task_result(task: Dict, condition: str):
     task[f"{condition}_condition_reference_TestResults"]  = None
     task[f"{condition}_condition_candidates_TestResults"] = None
     task[f"{condition}_condition_ResultsSummary"] = None
+    task[f"{condition}_condition_timeouts"] = None
 
     # we first handle the case when the task pre- or post-condition
     # does not exists:
@@ -169,46 +463,46 @@ def evaluate_task_result(task: Dict, condition: str):
     # The task pre-/post- exists, we proceed. First we will execute the test suites on
     # the solution pre/post-cond
 
-    # executing the solution-function def; not expecting it to fail
+    # executing the solution-function def; not expecting it to fail. Its namespace is
+    # the base of the namespaces of the candidates (so, what the solution imports or
+    # defines is visible to them too). It is not changed by the candidates, as each
+    # gets a copy.
     #complete_solution_function = task[f"{condition}_condition_incomplete"] + "\n" + indented_solution_function_body
     try:
-        exec(solution_function,globals())
+        solution = load_function(solution_function, f"check_{condition}_solution_{Tid}")
+        baseNamespace = solution.__globals__
     except:
         print(">>>>>> Ouch. The def of the solution function CRASHED!")
         print(solution_function)
         return
 
     # if the test-cases are marked with a split token, this indicates that
-    # they consists of two groups: base-group and validation-group.
-    # We separate them:
-    splitToken = '==='
-    test_cases0 = eval(task[f"{condition}_condition_tests"])
-    test_suites = listSplit(test_cases0,splitToken)
-    suite_Base0 = test_suites[0]
-    suite_Base1 = []
-    suite_Validation = []
-    if len(test_suites) == 2:
-       suite_Validation = test_suites[1]
-    elif len(test_suites) > 2: 
-        suite_Base1 = test_suites[1]
-        for suite in test_suites[2:] : suite_Validation.extend(suite)
-    else:
-        # should not happen... but if this does happen,
-        # then we simply have no validation suite
-        suite_Validation = []
+    # they consists of two groups: base-group and validation-group. 
+    # They are already separated (see testSuites.py):
+    test_suites = get_test_suites(task, condition)
+    suite_Base0 = test_suites["base0"]
+    suite_Base1 = test_suites["base1"]
+    suite_Validation = test_suites["validation"]
 
     # executing the test-cases on the solution-function, also not expecting these
-    # to fail:
-    print(f"  Running test suites on the reference solution. #Base0={len(suite_Base0)}, #Base1={len(suite_Base1)}, #Validation={len(suite_Validation)}")
-    reference_results_Base0 = [eval(f"check_{condition}_solution_{Tid}(*test_case)") for test_case in suite_Base0]
-    reference_results_Base1 = [eval(f"check_{condition}_solution_{Tid}(*test_case)") for test_case in suite_Base1]
-    reference_results_Validation = [eval(f"check_{condition}_solution_{Tid}(*test_case)") for test_case in suite_Validation]
-
-    R = {
-        "base0" : reference_results_Base0,
-        "base1" : reference_results_Base1,
-        "validationSuite" : reference_results_Validation
-    }
+    # to fail. The results may already be in the cache, from an earlier experiment:
+    cached = referenceCache.lookup(solution_function, task[f"{condition}_condition_tests"])
+    if cached != None:
+        print(f"  Reference results of the test suites found in the cache. #Base0={len(suite_Base0)}, #Base1={len(suite_Base1)}, #Validation={len(suite_Validation)}")
+        (R,runtimes) = cached
+    else:
+        print(f"  Running test suites on the reference solution. #Base0={len(suite_Base0)}, #Base1={len(suite_Base1)}, #Validation={len(suite_Validation)}")
+        R = {}
+        runtimes = {}
+        for (suiteName,suite) in [("base0",suite_Base0), ("base1",suite_Base1), ("validationSuite",suite_Validation)]:
+            (R[suiteName], runtimes[suiteName]) = run_reference_suite(solution, suite)
+        referenceCache.store(solution_function, task[f"{condition}_condition_tests"], R, runtimes)
+    timeouts = choose_timeouts(runtimes)
+    task[f"{condition}_condition_timeouts"] = timeouts
+    reference_results_Base0 = R["base0"]
+    reference_results_Base1 = R["base1"]
+    reference_results_Validation = R["validationSuite"]
+
     task[f"{condition}_condition_reference_TestResults"]  = R
     if DEBUG:
         print(solution_function)
@@ -223,19 +517,44 @@ def evaluate_task_result(task: Dict, condition: str):
     AI_completions = [ textwrap.indent(body,'    ') if body != None else '' for body in task[f"{condition}_condition_completions"] ]
     # now, evaliate each candidate-completion:
     tasks_results = [] 
+    # candidates that are the same (modulo layout, comments, and docstrings) are evaluated 
+    # only once; this maps their fingerprint to the first of them:
+    evaluatedCandidates = {}
+    # the candidates to evaluate by clustering them (see myconfig.CLUSTER_CANDIDATES):
+    toCluster = []
 
     for k in range(len(AI_completions)):
         indented_function_body = AI_completions[k]
         complete_function = task[f"{condition}_condition_incomplete"] + "\n" + indented_function_body
-        dummy_function = task[f"{condition}_condition_incomplete"] + "\n   raise(\"dummy function invoked!\")"
 
         U = { "nr" : k }
         tasks_results.append(U)
+
+        fingerprint = astFingerprint(complete_function)
+        if myconfig.DEDUPLICATE_CANDIDATES and fingerprint != None and fingerprint in evaluatedCandidates:
+            original = evaluatedCandidates[fingerprint]
+            print(f"      Candidate {k} is the same as candidate {original['nr']}")
+            # its results are copied from the original, once these are known (below)
+            U["duplicateOf"] = original["nr"]
+            U["src"] = complete_function
+            continue
+        if myconfig.DEDUPLICATE_CANDIDATES and fingerprint != None:
+            evaluatedCandidates[fingerprint] = U
+
+        # the same candidate may have been evaluated in an earlier experiment:
+        cached = verdictCache.lookup(fingerprint, solution_function, task[f"{condition}_condition_tests"])
+        if cached != None:
+            print(f"      Results of candidate {k} found in the cache")
+            U["def-loaded"] = "success"
+            U["base0"] = cached["base0"]
+            U["base1"] = cached["base1"]
+            U["validationSuite"] = cached["validationSuite"]
+            U["src"] = complete_function
+            continue
     
         # executing the def. of the AI's function; it may fail (e.g. if AI's code is not even syntax correct)
         try:
-            exec(dummy_function,globals())
-            exec(complete_function,globals())
+            candidate = load_function(complete_function, f"check_{condition}_{Tid}", baseNamespace)
             U["def-loaded"] = "success"
         except:
             print(f">>>>>> The def of completion-proposal {k} crashed!")
@@ -246,39 +565,90 @@ def evaluate_task_result(task: Dict, condition: str):
         print(f"      Running tests on candidate {k}")
 
         # running the test-cases on the AI's function; this may fail too:
-        results_Base0 = [try_check_condition(test_case, task["task_id"],condition) for test_case in suite_Base0]
-        results_Base1 = [try_check_condition(test_case, task["task_id"],condition) for test_case in suite_Base1]
-        results_Validation = [try_check_condition(test_case, task["task_id"],condition) for test_case in suite_Validation]
+        budget = TimeBudget(timeouts["candidateBudget"])
+        if myconfig.CLUSTER_CANDIDATES:
+            # the candidate is run later, together with the others (see below)
+            toCluster.append((U,candidate,fingerprint))
+            U["src"] = complete_function
+            continue
+        if myconfig.EARLY_EXIT:
+            # base0 and base1 are tracked together, as they make up the allBases verdict; if
+            # that is already final after base0, base1 is skipped altogether:
+            basesTracker = verdicts.VerdictTracker(reference_results_Base0 + reference_results_Base1)
+            validationTracker = verdicts.VerdictTracker(reference_results_Validation)
+            results_Base0 = run_test_suite(candidate, suite_Base0, basesTracker, timeouts["base0"], budget)
+            if basesTracker.isFinal():
+                results_Base1 = basesTracker.skip(len(suite_Base1))
+            else:
+                results_Base1 = run_test_suite(candidate, suite_Base1, basesTracker, timeouts["base1"], budget)
+            results_Validation = run_test_suite(candidate, suite_Validation, validationTracker, timeouts["validationSuite"], budget)
+        else:
+            results_Base0 = run_test_suite(candidate, suite_Base0, None, timeouts["base0"], budget)
+            results_Base1 = run_test_suite(candidate, suite_Base1, None, timeouts["base1"], budget)
+            results_Validation = run_test_suite(candidate, suite_Validation, None, timeouts["validationSuite"], budget)
 
         U["base0"] =  results_Base0
         U["base1"] =  results_Base1
         U["validationSuite"] =  results_Validation
-        U["base0-verdict"] = compare_results(reference_results_Base0, results_Base0)
-        U["allBases-verdict"] = compare_results(
-                                        reference_results_Base0 + reference_results_Base1, 
-                                        results_Base0 + results_Base1)
-        U["validation-verdict"] = compare_results(reference_results_Validation, results_Validation)
-        U["allsuites-verdict"] = compare_results(
-                                        reference_results_Base0 + reference_results_Base1 + reference_results_Validation, 
-                                        results_Base0 + results_Base1 + results_Validation)
-        U["editDistance"] = similarity.levenshteinDistance(solution_function,complete_function)["relativeDistance"]
+        U["src"] = complete_function
+        verdictCache.store(fingerprint, solution_function, task[f"{condition}_condition_tests"], U)
 
         if DEBUG:
             print(f"   Candidate {k}:")
             print(complete_function)
             print(f"   Candidate {k} tests results:")
             print(f"  {R}")
+
+    clusters = None
+    if len(toCluster) > 0:
+        clusters = evaluate_candidates_clustered(toCluster, suite_Base0, suite_Base1, suite_Validation, timeouts)
+        for (U,candidate,fingerprint) in toCluster:
+            if not "clusterOf" in U:
+                verdictCache.store(fingerprint, solution_function, task[f"{condition}_condition_tests"], U)
+
+    # the duplicates get the results of their original:
+    for U in tasks_results:
+        if "duplicateOf" in U:
+            original = tasks_results[U["duplicateOf"]]
+            U["def-loaded"] = original["def-loaded"]
+            if U["def-loaded"] == "success":
+                U["base0"] = list(original["base0"])
+                U["base1"] = list(original["base1"])
+                U["validationSuite"] = list(original["validationSuite"])
+            else:
+                del U["src"]
     
     task[f"{condition}_condition_candidates_TestResults"] = tasks_results
     nonCrashes = [ V for V in tasks_results if V["def-loaded"] == "success" ]
     defCrashes = len(tasks_results) - len(nonCrashes)
-    base0_accept       = len([ 1 for V in nonCrashes if V["base0-verdict"]=="accepted"])
-    base0_tooWeak      = len([ 1 for V in nonCrashes if V["base0-verdict"]=="too_weak"])
-    base0_tooStrong    = len([ 1 for V in nonCrashes if V["base0-verdict"]=="too_strong"])
-    allBases_accept    = len([ 1 for V in nonCrashes if V["allBases-verdict"]=="accepted"])
-    allBases_tooWeak   = len([ 1 for V in nonCrashes if V["allBases-verdict"]=="too_weak"])
-    allBases_tooStrong = len([ 1 for V in nonCrashes if V["allBases-verdict"]=="too_strong"])
-    allTests_accept    = len([ 1 for V in nonCrashes if V["allsuites-verdict"]=="accepted"])
+
+    # calculating the verdicts of all (non-crashing) candidates at once, from their
+    # outcome matrix (see verdicts.py):
+    M = verdicts.outcome_matrix([ V["base0"] + V["base1"] + V["validationSuite"] for V in nonCrashes ],
+                                len(suite_Base0) + len(suite_Base1) + len(suite_Validation))
+    VS = verdicts.suite_verdicts(R, M)
+    sources = [ V["src"] for V in nonCrashes ]
+    for i,V in enumerate(nonCrashes):
+        V["base0-verdict"]      = verdicts.VERDICTS[VS["base0"][i]]
+        V["allBases-verdict"]   = verdicts.VERDICTS[VS["allBases"][i]]
+        V["validation-verdict"] = verdicts.VERDICTS[VS["validation"][i]]
+        V["allsuites-verdict"]  = verdicts.VERDICTS[VS["allsuites"][i]]
+        # the edit-distance is only needed for the candidates that count in the averages
+        # of allBases-accepted and allBases-too-weak/strong (see below):
+        src = V.pop("src")
+        V["editDistance"] = None
+        if V["allBases-verdict"] in {"accepted", "too_weak", "too_strong"}:
+            D = similarity.levenshteinDistance(solution_function,src)
+            if D != None:
+                V["editDistance"] = D["relativeDistance"]
+    base0_accept       = verdicts.count(VS["base0"], verdicts.ACCEPTED)
+    base0_tooWeak      = verdicts.count(VS["base0"], verdicts.TOO_WEAK)
+    base0_tooStrong    = verdicts.count(VS["base0"], verdicts.TOO_STRONG)
+    allBases_accept    = verdicts.count(VS["allBases"], verdicts.ACCEPTED)
+    allBases_tooWeak   = verdicts.count(VS["allBases"], verdicts.TOO_WEAK)
+    allBases_tooStrong = verdicts.count(VS["allBases"], verdicts.TOO_STRONG)
+    allTests_accept    = verdicts.count(VS["allsuites"], verdicts.ACCEPTED)
+    skippedTests       = int((M == verdicts.SKIPPED).sum())
 
     summary = {
         "defCrashes"         : defCrashes,
@@ -289,10 +659,16 @@ def evaluate_task_result(task: Dict, condition: str):
         "allBases_tooWeak"   : allBases_tooWeak,
         "allBases_tooStrong" : allBases_tooStrong,
         "allTests_accept"    : allTests_accept,
+        "skippedTests"       : skippedTests,
         "allBasesAccept_avrg_editDist" : None,
-        "allBases_tooWeakOrStrong_avrg_editDist" : None
+        "allBases_tooWeakOrStrong_avrg_editDist" : None,
+        # how diverse the candidates are: the average distance between two of them
+        "candidates_avrg_charDist"  : similarity.diversity(sources),
+        "candidates_avrg_tokenDist" : similarity.diversity(sources, tokens=True)
     }
 
+    if clusters != None:
+        summary["clusters"] = clusters
     task[f"{condition}_condition_ResultsSummary"] = summary
 
     print(f"   #chrashes = {defCrashes}")
@@ -303,6 +679,8 @@ def evaluate_task_result(task: Dict, condition: str):
     print(f"   #allBases-too-weak   = {allBases_tooWeak}")   
     print(f"   #allBases-too-strong = {allBases_tooStrong}")   
     print(f"   #ALLTESTS=ACCEPT     = {allTests_accept}")   
+    if skippedTests > 0:
+        print(f"   #skipped test-cases  = {skippedTests}")
 
     if allBases_accept > 0 :
         allBasesAccept_avrg_editDist = statistics.mean([ V["editDistance"] for V in nonCrashes if V["allBases-verdict"]=="accepted"])
@@ -312,6 +690,8 @@ def evaluate_task_result(task: Dict, condition: str):
         allBases_tooWeakOrStrong_avrg_editDits = statistics.mean([ V["editDistance"] for V in nonCrashes if V["allBases-verdict"] in {"too_weak", "too_strong"}])
         summary["allBases_tooWeakOrStrong_avrg_editDist"] = allBases_tooWeakOrStrong_avrg_editDits
         print(f"   allBases-too-weak-or-strong avrg-dist = {allBases_tooWeakOrStrong_avrg_editDits}")  
+    if summary["candidates_avrg_charDist"] != None :
+        print(f"   candidates avrg-dist (chars/tokens) = {summary['candidates_avrg_charDist']} / {summary['candidates_avrg_tokenDist']}")
     
  
 
@@ -339,6 +719,8 @@ def mk_results_summary(tasks: Dict[str,Dict]) -> tuple :
         summary["accepted by all-base-tests"] = numOf_allBases_accept
         summary["weakly accepted by all-base-tests"] = numOf_allBases_weakAccept
         summary["accepted by all-tests"] = numOf_allTests_accept
+        # test-cases skipped by the early exit (see myconfig.EARLY_EXIT); older results don't have this:
+        summary["skipped test-cases"] = sum([ S.get("skippedTests",0) for S in hasResults ])
 
         editDistances1 = [ S["allBasesAccept_avrg_editDist"] 
                                 for S in hasResults 
@@ -378,6 +760,7 @@ def write_wholeSet_summary(precond_evaluation_summary,
         N1  = summary["accepted by all-base-tests"]
         N1b = summary["weakly accepted by all-base-tests"] 
         N2  = summary["accepted by all-tests"] 
+        skipped = summary.get("skipped test-cases",0)
         
         lev1 = summary["allBasesAccept_avrg_editDist"]
         lev2 = summary["allBases_tooWeakOrStrong_avrg_editDist"]
@@ -397,6 +780,8 @@ def write_wholeSet_summary(precond_evaluation_summary,
         str += f"\n   accepted by ALL-tests (validation) : {N2} ({percent2}%)"
         str += f"\n   avrg-edit-dist of accepted by all-base-tests               : {lev1}"
         str += f"\n   avrg-edit-dist of too-weak or too-strong on all-base-tests : {lev2}"
+        if skipped > 0:
+            str += f"\n   test-cases skipped (early exit) : {skipped}"
         str += "\n"
 
         print(str)
@@ -414,7 +799,7 @@ def write_perTask_summaries(tasks: Dict[str,Dict], reportfile_basename:str):
     Write per-task summary to a csv-file.
     """
 
-    numOfColumns = 13
+    numOfColumns = 15
 
     if reportfile_basename == None: return
     reportfile = reportfile_basename + ".csv"
@@ -448,7 +833,10 @@ def write_perTask_summaries(tasks: Dict[str,Dict], reportfile_basename:str):
                     taskSummary["allBases_tooStrong"] , 
                     taskSummary["allTests_accept"] ,
                     taskSummary["allBasesAccept_avrg_editDist"] , 
-                    taskSummary["allBases_tooWeakOrStrong_avrg_editDist"]
+                    taskSummary["allBases_tooWeakOrStrong_avrg_editDist"],
+                    # not in summaries of older results:
+                    taskSummary.get("candidates_avrg_charDist"),
+                    taskSummary.get("candidates_avrg_tokenDist")
                 ]
 
                 for v in values:
@@ -457,19 +845,21 @@ def write_perTask_summaries(tasks: Dict[str,Dict], reportfile_basename:str):
             str += "\n"
             f.write(str)
 
-        # printing the column-names; there should be 13 of them ...
+        # printing the column-names; there should be 15 of them ...
         f.write("task-id,cond-type")
         f.write(",deploy,crashing-candidates")
         f.write(",base0-accept,base0-tooWeak,base0-tooStrong")
         f.write(",allBases-accept,allBases-tooWeak,allBases-tooStrong,allTests-accept")
-        f.write(",allBases-accept-avrg-edit-dist,allBases-tooWeakOrStrong-avrg-edit-dist\n")
+        f.write(",allBases-accept-avrg-edit-dist,allBases-tooWeakOrStrong-avrg-edit-dist")
+        f.write(",candidates-avrg-char-dist,candidates-avrg-token-dist\n")
         # printing the rows:
         for tId in tasks:
             task = tasks[tId]
             worker(tId,task,"pre")
             worker(tId,task,"post")
 
-def evaluate_tasks_results(tasks: Dict[str,Dict], reportfile_basename:str)  :
+def evaluate_tasks_results(tasks: Dict[str,Dict], reportfile_basename:str, journal=None, onTaskEvaluated=None, 
+                           withSummaries:bool=True)  :
     """
     Run the basic evaluation for all the tasks. This iterates over the tasks, and performs
     basic evaluation on each of then.
@@ -477,11 +867,29 @@ def evaluate_tasks_results(tasks: Dict[str,Dict], reportfile_basename:str)  :
     The collected data and the evaluation data per task is inserted into each task-dictionary.
     Additionally this function will print and save summaries. One summary for the whole
     dataset will be produced, and a csv-file containing per-task-summaries is also produced.
+
+    If a journal (see journal.py) is given, tasks whose evaluation is in the journal are 
+    not evaluated again, and the evaluation of every other task is recorded in it.
+
+    If onTaskEvaluated is given, it is called on every task once its evaluation is done.
+    If withSummaries is false, the summaries are not written (e.g. because the tasks are 
+    only a batch of the dataset).
     """
     for tID in tasks:
         T = tasks[tID]
-        evaluate_task_result(T, "pre")
-        evaluate_task_result(T, "post")
+        if journal == None or not journal.restoreEvaluation(T):
+            evaluate_task_result(T, "pre")
+            evaluate_task_result(T, "post")
+            if journal != None: journal.recordEvaluation(T)
+        if onTaskEvaluated != None: onTaskEvaluated(T)
+    if withSummaries:
+        write_evaluation_summaries(tasks,reportfile_basename)
+
+def write_evaluation_summaries(tasks: Dict[str,Dict], reportfile_basename:str) :
+    """
+    Print and save the summaries of the evaluation of the given tasks, which are assumed
+    to have been evaluated (e.g. by evaluate_task_result). 
+    """
     summaries = mk_results_summary(tasks)
     write_perTask_summaries(tasks,reportfile_basename)
     write_wholeSet_summary(summaries[0],summaries[1],reportfile_basename)
@@ -3,18 +3,18 @@
 #
 import data
 import os
+import testSuites
 
 
 def printPrograms_InDataSet(data_file: str, whichProblem:str) -> None :
    """
    Print the programs in the dataset.
    """
-   problems = data.read_problems(data_file)
-   if whichProblem != None :
-      problems = { whichProblem : problems[whichProblem] }
-
-   for p in problems:
-      P = problems[p]
+   # the problems are streamed, so the dataset does not have to fit in memory:
+   for P in data.stream_json(data_file):
+      p = P["task_id"]
+      if whichProblem != None and p != whichProblem :
+         continue
       print("")
       print(f"** Problem {p} **")
       if "program" in P:
@@ -32,13 +32,18 @@ def checkPrePostSolutions_InDataSet(data_file: str) -> None :
    Check if the pre- and post-conditions in the given data set can be
    read by Python, and then if the corresponding test-cases of these
    pre-/post-conditions can be executed without crashing.
+
+   The problems are streamed, one at a time, and the solutions of each problem are
+   loaded in a namespace of its own; so, the memory use does not grow with the dataset.
    """
-   problems = data.read_problems(data_file)
-   print(f"** Checking {len(problems)} problems...")
+   print(f"** Checking the problems in {data_file}...")
    all_ok = True
-   for p in problems:
-      P = problems[p]
+   numOfProblems = 0
+   for P in data.stream_json(data_file):
+      p = P["task_id"]
       problemId = p
+      numOfProblems += 1
+      namespace = {}
       print(f"** Problem {problemId}:")
       
       preSolution = None
@@ -49,14 +54,15 @@ def checkPrePostSolutions_InDataSet(data_file: str) -> None :
       else:
          preSolution = P["pre_condition_solution"]
          try:
-            exec(preSolution,globals())
+            exec(preSolution,namespace)
          except:
             print(f">>> OUCH pre-cond problem {p} has a problem.")
             print(preSolution)
          try:
-            test_cases = [ tc for tc in eval(P["pre_condition_tests"]) if tc != "===" ]
+            test_cases = testSuites.all_test_cases(testSuites.compile_test_suites(P.get("pre_condition_tests")))
             #print(test_cases)
-            solution_results = [eval(f"check_pre_solution_{problemId}(*test_case)") for test_case in test_cases]
+            preCond = namespace[f"check_pre_solution_{problemId}"]
+            solution_results = [preCond(*test_case) for test_case in test_cases]
             print(f"   precond tests results:{solution_results}")
          except:
             print(f">>> OUCH pre-cond problem {p} has a crashing test")
@@ -68,14 +74,15 @@ def checkPrePostSolutions_InDataSet(data_file: str) -> None :
       else:
          postSolution = P["post_condition_solution"]
          try:
-            exec(postSolution,globals())
+            exec(postSolution,namespace)
          except:
             print(f">>> OUCH post-cond problem {p} has a problem.")
             print(postSolution)
             raise Exception("OUCH")
          try:
-            test_cases = [tc for tc in eval(P["post_condition_tests"]) if tc != "===" ]
-            solution_results = [eval(f"check_post_solution_{problemId}(*test_case)") for test_case in test_cases]
+            test_cases = testSuites.all_test_cases(testSuites.compile_test_suites(P.get("post_condition_tests")))
+            postCond = namespace[f"check_post_solution_{problemId}"]
+            solution_results = [postCond(*test_case) for test_case in test_cases]
             print(f"   postcond tests results:{solution_results}")
          except:
             print(f">>> OUCH post-cond problem {p} has a crashing test")
@@ -84,7 +91,7 @@ def checkPrePostSolutions_InDataSet(data_file: str) -> None :
          if "program" in P:
             prg = P["program"]
             try:
-               exec(prg,globals())
+               exec(prg,namespace)
             except:
                print(f">>> OUCH the program of problem {p} has a problem.")
                print(prg)
@@ -92,25 +99,25 @@ def checkPrePostSolutions_InDataSet(data_file: str) -> None :
             zzz = []
             for tc in test_cases:
                tc_ = tc[1:]
-               if preSolution != None and not(eval(f"check_pre_solution_{problemId}(*tc_)")) :
+               if preSolution != None and not(namespace[f"check_pre_solution_{problemId}"](*tc_)) :
                   verdict = 'rejected by pre-cond'
                   zzz.append(verdict)
                   continue
-               retval = eval(f"Pr_{problemId}(*tc_)")
+               retval = namespace[f"Pr_{problemId}"](*tc_)
                tc_.insert(0,retval)
-               verdict = eval(f"check_post_solution_{problemId}(*tc_)")
+               verdict = postCond(*tc_)
                zzz.append((retval,verdict))
             print(f"   prg-run tests results:{zzz}")
             ok = all([ r[1] for r in zzz])
             print(f"   prg-run tests all-pass: {ok}")
             all_ok = all_ok and ok
                
-   print( "** Done running all tests...")
+   print(f"** Done running all tests of {numOfProblems} problems...")
    print(f"** All prg-tests passed: {all_ok}")
 
 
 def printField_InDataSet(data_file:str, id:str, idFieldName:str, fieldToPrint:str) -> None :
-   for P in data.stream_jsonl(data_file) :
+   for P in data.stream_json(data_file) :
      if P[idFieldName] == id :
         if fieldToPrint in P :
            print(P[fieldToPrint])
@@ -4,13 +4,15 @@
 import sys, getopt
 import os
 import time
-from openai4spi import PromptResponder, generate_results, MyOpenAIClient
+from openai4spi import PromptResponder, generate_results, MyOpenAIClient, RESULTS_FORMATS
 from llm4spi import MyGPT4ALL_Client
 from groq4spi import MyGroqClient
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from gpt4all import GPT4All
 from google import genai
 from google4spi import GoogleResponder
+from responseCache import CachingResponder
+from rateLimiter import getRateLimiter
 
 DEBUG = True
 
@@ -27,8 +29,20 @@ options = [
    ("experimentName",  "The name of the experiment. Reports will be produced prefixed with this name."),
    ("enableEvaluation", "If present will enable or disable evaluation. If not present, evaluation is enabled."),
    ("allowMultipleAnswers", "If present specifies how many answers per problem are requested. If not present it is 1."),
+   ("maxConcurrency", "The maximum number of prompts sent to the LLM at the same time. If not present it is 1 (prompts are sent one at a time)."),
+   ("pipelined", "If present (and not false), completions are evaluated while the next ones are still being generated."),
+   ("pipelineQueueSize", "In the pipelined mode, the maximum number of generated tasks waiting for evaluation. Default is 4."),
+   ("numOfEvaluationWorkers", "In the pipelined mode, the number of evaluation workers. Default is 1."),
+   ("numOfEvaluationProcesses", "The number of worker processes to run the evaluation. Default is 1 (no worker processes)."),
+   ("batchSize", "If given, the dataset is read and processed in batches of this many tasks. Default is none (all at once)."),
+   ("resultsFormat", "The format of the results file: json, jsonl, jsonl.gz, or npz. Default is json."),
+   ("resume", "If present (and not false), resume the experiment from its journal, skipping tasks that were already generated/evaluated."),
+   ("responseCache", "If present, specifies an (sqlite) file in which the LLM responses are cached, and reused in later runs."),
    ("gpt4all_localModelPath", "If a local GPT4ALL model is used, this point to the folder where GPT4AALL models are placed. Default is ../../models"),
    ("gpt4all_device", "If a local GPT4ALL model is used, this specifies to use cpu or gpu-id for running the model. if not specified, cpu is used."),
+   ("rpm", "Requests per minute allowed by the provider (openAI, groq). If not present, not limited."),
+   ("tpm", "Tokens per minute allowed by the provider (openAI, groq). If not present, not limited, except for groq (6000)."),
+   ("rpd", "Requests per day allowed by the provider (openAI, groq). If not present, not limited."),
    ("gemini_rpm", "Request per minute for Google Gemini models."),
    ("gemini_tpm", "Tokens per minute for Google Gemini models."),
    ("gemini_rpd", "Request per day for Google Gemini models.")
@@ -50,8 +64,20 @@ def main(argv):
    specificProblem_ = None
    enableEvaluation_ = True
    allowMultipleAnswers_ = 1
+   maxConcurrency_ = 1
+   pipelined_ = False
+   pipelineQueueSize_ = 4
+   numOfEvaluationWorkers_ = 1
+   responseCache_ = None
+   resume_ = False
+   resultsFormat_ = "json"
+   numOfEvaluationProcesses_ = 1
+   batchSize_ = None
    gpt4all_localModelPath_ = os.path.join(ROOT, "..", "..", "models") 
    gpt4all_device_ = "cpu"
+   rpm_ = None
+   tpm_ = None
+   rpd_ = None
    gemini_rpm_ = 15
    gemini_tpm_ = 1000000
    gemini_rpd_ = 1500
@@ -81,8 +107,24 @@ def main(argv):
          case "--specificProblem" : specificProblem_ = arg
          case "--enableEvaluation" : enableEvaluation_ = bool(arg)
          case "--allowMultipleAnswers" : allowMultipleAnswers_ = int(arg)
+         case "--maxConcurrency" : maxConcurrency_ = int(arg)
+         case "--pipelined" : pipelined_ = arg.lower() != "false"
+         case "--pipelineQueueSize" : pipelineQueueSize_ = int(arg)
+         case "--numOfEvaluationWorkers" : numOfEvaluationWorkers_ = int(arg)
+         case "--responseCache" : responseCache_ = arg
+         case "--resume" : resume_ = arg.lower() != "false"
+         case "--resultsFormat" :
+            resultsFormat_ = arg
+            if not (resultsFormat_ in RESULTS_FORMATS) :
+               print (f">> Unknown results format: {resultsFormat_}; choose from {RESULTS_FORMATS}")
+               sys.exit(2)
+         case "--numOfEvaluationProcesses" : numOfEvaluationProcesses_ = int(arg)
+         case "--batchSize" : batchSize_ = int(arg)
          case "--experimentName" : experimentName_ = arg
 
+         case "--rpm": rpm_ = int(arg)
+         case "--tpm": tpm_ = int(arg)
+         case "--rpd": rpd_ = int(arg)
          case "--gemini_rpm": gemini_rpm_ = int(arg)
          case "--gemini_tpm": gemini_tpm_ = int(arg)
          case "--gemini_rpd": gemini_rpd_ = int(arg)
@@ -92,15 +134,18 @@ def main(argv):
       case "openAI" : 
           openai_api_key = os.environ.get('OPENAI_API_KEY') 
           openAIclient = OpenAI(api_key=openai_api_key)
-          myAIclient = MyOpenAIClient(openAIclient,model_)
+          myAIclient = MyOpenAIClient(openAIclient,model_,asyncClient=AsyncOpenAI(api_key=openai_api_key))
+          if rpm_ != None or tpm_ != None or rpd_ != None:
+             myAIclient.rateLimiter = getRateLimiter(f"openAI/{model_}", rpm=rpm_, tpm=tpm_, rpd=rpd_)
       case "gpt4all" :
           gpt4allClient = GPT4All(model_, model_path=gpt4all_localModelPath_, device=gpt4all_device_)
-          myAIclient = MyGPT4ALL_Client(gpt4allClient)
+          myAIclient = MyGPT4ALL_Client(gpt4allClient,model_)
       case "groq" :
           groq_api_key = os.environ.get('GROQ_API_KEY') 
           openAIclient = OpenAI(base_url="https://api.groq.com/openai/v1",
                                 api_key=groq_api_key)    
-          myAIclient = MyGroqClient(openAIclient,model_)
+          myAIclient = MyGroqClient(openAIclient,model_,
+                                    rpm_limit=rpm_, tpm_limit=(6000 if tpm_ == None else tpm_), rpd_limit=rpd_)
       case "gemini" :
           gemini_api_key = os.environ.get('GEMINI_API_KEY')
           geminiClient = genai.Client(api_key=gemini_api_key)
@@ -109,6 +154,9 @@ def main(argv):
 
    myAIclient.DEBUG = DEBUG
 
+   if responseCache_ != None:
+      myAIclient = CachingResponder(myAIclient, responseCache_)
+
    # run the analysis:
    dataset = os.path.join(benchmarkDir_, benchmark_)
    if experimentName_ == None:
@@ -119,7 +167,15 @@ def main(argv):
                     experimentName   = experimentName_,     
                     enableEvaluation = enableEvaluation_, 
                     allowMultipleAnswers = allowMultipleAnswers_,
-                    prompt_type = prompt_type_
+                    prompt_type = prompt_type_,
+                    maxConcurrency = maxConcurrency_,
+                    pipelined = pipelined_,
+                    pipelineQueueSize = pipelineQueueSize_,
+                    numOfEvaluationWorkers = numOfEvaluationWorkers_,
+                    resume = resume_,
+                    resultsFormat = resultsFormat_,
+                    numOfEvaluationProcesses = numOfEvaluationProcesses_,
+                    batchSize = batchSize_
                     )
    
    
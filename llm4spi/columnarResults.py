@@ -0,0 +1,237 @@
+#
+# A compact, columnar format of the results of an experiment (see openai4spi.mk_task_record).
+# In the json results every test-result of every candidate is a separate json value; with
+# many tasks, candidates, and test-cases this gives huge files that are slow to load. Here,
+# the results are stored as numpy arrays, in a single .npz file that can be loaded with
+# numpy.load without parsing any json:
+#
+#   the (task,condition) pairs, called groups, in the order of the results:
+#      group_task, group_cond    : the task-id and the condition type (pre/post)
+#      group_results             : whether the group has test-results (RESULTS_ABSENT/NONE/PRESENT)
+#      group_numTests            : the number of base0, base1, and validation tests (G x 3)
+#      group_candidates          : offsets in the candidate arrays (G+1); the candidates of group
+#                                  g are group_candidates[g] .. group_candidates[g+1]-1
+#      group_reference           : offsets in ref_codes (G+1)
+#      ref_codes                 : the outcome codes (see verdicts.py) of the reference solutions
+#
+#   the candidates:
+#      cand_nr, cand_duplicateOf : the candidate's number, and the number of its original (or -1)
+#      cand_loaded               : whether the def of the candidate could be loaded
+#      cand_verdicts             : the base0, allBases, validation, and allsuites verdicts, as
+#                                  indices in verdicts.VERDICTS (or -1) (C x 4)
+#      cand_editDistance         : the edit distance to the solution (or NaN)
+#      cand_outcomes             : offsets in the outcome bits (C+1); a loaded candidate has the
+#                                  outcomes of base0, base1, and validation, in this order
+#      cand_extra                : other fields of the candidate, as a json string (or "")
+#
+#   the outcomes of all candidates, one after another:
+#      outcome_true              : bit-packed; the outcome is True
+#      outcome_failed            : bit-packed; the outcome is not a boolean (None, "failed", etc.)
+#      failed_index, failed_code : the position and the outcome code of every such outcome
+#
+#   task_meta                    : per task, the other fields of its record, as a json string
+#                                  (the fields of the test-results are there as None)
+#
+# convert_results converts a json/jsonl results file to this format, and read_records
+# converts it back to the records of the json format.
+#
+from typing import Dict, Iterable
+import json
+import sys
+import numpy as np
+
+import data
+import verdicts
+
+CONDTYPES = ["pre","post"]
+SUITES = ["base0","base1","validationSuite"]
+VERDICT_FIELDS = ["base0-verdict","allBases-verdict","validation-verdict","allsuites-verdict"]
+# the candidate fields that have columns of their own:
+CANDIDATE_FIELDS = ["nr","duplicateOf","def-loaded","editDistance"] + SUITES + VERDICT_FIELDS
+
+# the values of group_results; a record without evaluation has no test-results at all,
+# and a group whose evaluation failed has None:
+RESULTS_ABSENT  = 0
+RESULTS_NONE    = 1
+RESULTS_PRESENT = 2
+
+
+def write_columnar(filename:str, records:Iterable[Dict]) :
+    """
+    Write the given task records (as in a json results file) to a columnar results file
+    (.npz).
+    """
+    groupTask = []
+    groupCond = []
+    groupResults = []
+    groupNumTests = []
+    groupCandidates = [0]
+    groupReference = [0]
+    refCodes = []
+    candNr = []
+    candDuplicateOf = []
+    candLoaded = []
+    candVerdicts = []
+    candEditDistance = []
+    candOutcomes = [0]
+    candExtra = []
+    outcomeCodes = []
+    taskMeta = []
+    numOfOutcomes = 0
+    for R in records:
+        meta = dict(R)
+        for condTy in CONDTYPES:
+            candidatesField = f"{condTy}_condition_candidates_TestResults"
+            referenceField = f"{condTy}_condition_reference_TestResults"
+            candidates = R.get(candidatesField)
+            reference = R.get(referenceField)
+            if candidatesField in R:
+                # only their place in the record is kept:
+                meta[candidatesField] = None
+                meta[referenceField] = None
+            groupTask.append(R["task_id"])
+            groupCond.append(condTy)
+            if not candidatesField in R:
+                groupResults.append(RESULTS_ABSENT)
+            elif candidates == None or reference == None:
+                groupResults.append(RESULTS_NONE)
+            else:
+                groupResults.append(RESULTS_PRESENT)
+            if groupResults[-1] != RESULTS_PRESENT:
+                candidates = []
+                reference = { suite : [] for suite in SUITES }
+            groupNumTests.append([ len(reference[suite]) for suite in SUITES ])
+            for suite in SUITES:
+                refCodes.append(verdicts.encode(reference[suite]))
+            groupReference.append(groupReference[-1] + sum(groupNumTests[-1]))
+            for U in candidates:
+                candNr.append(U["nr"])
+                candDuplicateOf.append(U.get("duplicateOf",-1))
+                candLoaded.append(U["def-loaded"] == "success")
+                candVerdicts.append([ verdicts.VERDICTS.index(U[field]) if U.get(field) != None else -1
+                                      for field in VERDICT_FIELDS ])
+                D = U.get("editDistance")
+                candEditDistance.append(np.nan if D == None else D)
+                if candLoaded[-1]:
+                    if [ len(U[suite]) for suite in SUITES ] != groupNumTests[-1]:
+                        raise ValueError(f"candidate {U['nr']} of {R['task_id']}-{condTy} has not the same number of test-results as the reference")
+                    for suite in SUITES:
+                        outcomeCodes.append(verdicts.encode(U[suite]))
+                        numOfOutcomes += len(U[suite])
+                candOutcomes.append(numOfOutcomes)
+                extra = { key : value for (key,value) in U.items() if not key in CANDIDATE_FIELDS }
+                candExtra.append(json.dumps(extra) if len(extra) > 0 else "")
+            groupCandidates.append(len(candNr))
+        taskMeta.append(json.dumps(meta))
+
+    def concat(arrays):
+        return np.concatenate(arrays).astype(np.int8) if len(arrays) > 0 else np.zeros(0, dtype=np.int8)
+    codes = concat(outcomeCodes)
+    failed = (codes != verdicts.TRUE) & (codes != verdicts.FALSE)
+    # np.savez adds .npz to the name if it is missing, so the file is opened here:
+    with open(filename,'wb') as fp:
+        np.savez_compressed(fp,
+            group_task        = np.array(groupTask, dtype=str),
+            group_cond        = np.array(groupCond, dtype=str),
+            group_results     = np.array(groupResults, dtype=np.int8),
+            group_numTests    = np.array(groupNumTests, dtype=np.int32).reshape(-1,3),
+            group_candidates  = np.array(groupCandidates, dtype=np.int64),
+            group_reference   = np.array(groupReference, dtype=np.int64),
+            ref_codes         = concat(refCodes),
+            cand_nr           = np.array(candNr, dtype=np.int32),
+            cand_duplicateOf  = np.array(candDuplicateOf, dtype=np.int32),
+            cand_loaded       = np.array(candLoaded, dtype=bool),
+            cand_verdicts     = np.array(candVerdicts, dtype=np.int8).reshape(-1,4),
+            cand_editDistance = np.array(candEditDistance, dtype=np.float64),
+            cand_outcomes     = np.array(candOutcomes, dtype=np.int64),
+            cand_extra        = np.array(candExtra, dtype=str),
+            outcome_true      = np.packbits(codes == verdicts.TRUE),
+            outcome_failed    = np.packbits(failed),
+            failed_index      = np.flatnonzero(failed),
+            failed_code       = codes[failed],
+            task_meta         = np.array(taskMeta, dtype=str))
+
+
+def read_columnar(filename:str) -> Dict[str,np.ndarray] :
+    """
+    Read a columnar results file, as a dictionary of its arrays (see the top of this file).
+    The outcomes are unpacked to the array outcome_codes, with the outcome code of every
+    test-result of every loaded candidate.
+    """
+    with np.load(filename, allow_pickle=False) as Z:
+        A = { key : Z[key] for key in Z.files }
+    numOfOutcomes = int(A["cand_outcomes"][-1])
+    codes = np.unpackbits(A["outcome_true"], count=numOfOutcomes).astype(np.int8)
+    codes[A["failed_index"]] = A["failed_code"]
+    A["outcome_codes"] = codes
+    return A
+
+
+def read_records(filename:str) -> list :
+    """
+    Read a columnar results file, and return its task records in the layout of the json
+    results files.
+    """
+    A = read_columnar(filename)
+    codes = A["outcome_codes"]
+    records = []
+    g = 0
+    for meta in A["task_meta"].tolist():
+        R = json.loads(meta)
+        for condTy in CONDTYPES:
+            if A["group_results"][g] == RESULTS_PRESENT:
+                bounds = np.cumsum(np.concatenate(([0], A["group_numTests"][g])))
+                refCodes = A["ref_codes"][A["group_reference"][g] : A["group_reference"][g+1]]
+                R[f"{condTy}_condition_reference_TestResults"] = { suite : verdicts.decode(refCodes[bounds[k] : bounds[k+1]])
+                                                                   for (k,suite) in enumerate(SUITES) }
+                R[f"{condTy}_condition_candidates_TestResults"] = [ candidate_record(A, codes, c, bounds)
+                                      for c in range(A["group_candidates"][g], A["group_candidates"][g+1]) ]
+            g += 1
+        records.append(R)
+    return records
+
+def candidate_record(A:Dict, codes:np.ndarray, c:int, bounds:np.ndarray) -> Dict :
+    """
+    The json record of the c-th candidate in the columnar results A; bounds are the
+    bounds of the suites within the candidate's outcomes.
+    """
+    U = { "nr" : int(A["cand_nr"][c]) }
+    if A["cand_duplicateOf"][c] >= 0:
+        U["duplicateOf"] = int(A["cand_duplicateOf"][c])
+    if not A["cand_loaded"][c]:
+        U["def-loaded"] = "failed"
+    else:
+        U["def-loaded"] = "success"
+        outcomes = codes[A["cand_outcomes"][c] : A["cand_outcomes"][c+1]]
+        for (k,suite) in enumerate(SUITES):
+            U[suite] = verdicts.decode(outcomes[bounds[k] : bounds[k+1]])
+        for (k,field) in enumerate(VERDICT_FIELDS):
+            v = A["cand_verdicts"][c][k]
+            U[field] = verdicts.VERDICTS[v] if v >= 0 else None
+        D = float(A["cand_editDistance"][c])
+        U["editDistance"] = None if np.isnan(D) else D
+    if A["cand_extra"][c] != "":
+        U.update(json.loads(A["cand_extra"][c]))
+    return U
+
+
+def convert_results(resultsfile:str, columnarfile:str=None) -> str :
+    """
+    Convert a json/jsonl(.gz) results file to a columnar one (by default, named as the
+    results file but ending with .npz). Returns the name of the columnar file.
+    """
+    if columnarfile == None:
+        columnarfile = resultsfile.removesuffix(".gz").removesuffix(".jsonl").removesuffix(".json") + ".npz"
+    write_columnar(columnarfile, data.read_results(resultsfile))
+    return columnarfile
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("usage: python columnarResults.py <results.json|jsonl|jsonl.gz> [<columnar.npz>]")
+        print("       python columnarResults.py --to-json <columnar.npz> <results.json>")
+        sys.exit(1)
+    if sys.argv[1] == "--to-json":
+        data.write_json(sys.argv[3], read_records(sys.argv[2]))
+    else:
+        print(f"** Results converted to {convert_results(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)}")
@@ -0,0 +1,206 @@
+#
+# A compiled (binary) format of a dataset. Reading a json dataset means parsing all of its
+# tasks, even if only a few of them are needed (e.g. a single specificProblem). A compiled
+# dataset instead consists of the tasks as separate records, plus an index that gives the
+# offset of every task's record. The file is memory-mapped, and a task is only parsed when
+# it is accessed; the records of the tasks that are not selected are never touched.
+#
+# Layout (all numbers little-endian):
+#
+#    header : magic (8 bytes), format-version (u32), number of tasks (u32), offset of the index (u64),
+#             and of the json dataset it was compiled from: its size (u64), modification time
+#             in nanoseconds (u64), and sha256 hash (32 bytes)
+#    records: the json (utf-8) of every task, one after another
+#    index  : for every task, in the order of the dataset: offset (u64) and length (u64) of its
+#             record, length (u16) of its task-id, and the task-id itself (utf-8)
+#
+# A compiled dataset is made from a json dataset with compile_dataset, or from the command line:
+#
+#    python compiledDataset.py <dataset.json> [<compiled-file>]
+#
+# The compiled file is only used in place of its json dataset as long as it is up to date
+# (see is_up_to_date): the dataset must still have the recorded size, and either the recorded
+# modification time or, if that changed, the recorded hash.
+#
+from typing import Dict
+import json
+import mmap
+import os
+import hashlib
+import random
+import re
+import struct
+import sys
+
+MAGIC = b"LLM4SPID"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sIIQQQ32s")
+INDEX_ENTRY = struct.Struct("<QQH")
+
+
+def compiled_file(datafile:str) -> str :
+    """
+    The name of the compiled version of the given json dataset.
+    """
+    return datafile + ".compiled"
+
+def is_compiled(filename:str) -> bool :
+    """
+    True if the given file is a compiled dataset (it starts with the magic bytes).
+    """
+    try:
+        with open(filename,'rb') as fp:
+            return fp.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def compile_dataset(datafile:str, compiledfile:str=None) -> str :
+    """
+    Convert the given json dataset (a list of tasks, as e.g. mini.json) to the compiled
+    format. The compiled file is by default put next to the dataset (see compiled_file).
+    Returns the name of the compiled file.
+    """
+    if compiledfile == None:
+        compiledfile = compiled_file(datafile)
+    stat = os.stat(datafile)
+    with open(datafile,'rb') as fp:
+        content = fp.read()
+    tasks = json.loads(content)
+    source = (len(content), stat.st_mtime_ns, hashlib.sha256(content).digest())
+    index = []
+    tmpfile = compiledfile + f".{os.getpid()}.tmp"
+    with open(tmpfile,'wb') as fp:
+        fp.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(tasks), 0, *source))
+        for task in tasks:
+            record = json.dumps(task).encode('utf-8')
+            index.append((task["task_id"], fp.tell(), len(record)))
+            fp.write(record)
+        indexOffset = fp.tell()
+        for (Tid,offset,length) in index:
+            Tid = Tid.encode('utf-8')
+            fp.write(INDEX_ENTRY.pack(offset, length, len(Tid)))
+            fp.write(Tid)
+        fp.seek(0)
+        fp.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(tasks), indexOffset, *source))
+    os.replace(tmpfile, compiledfile)
+    return compiledfile
+
+def is_up_to_date(compiledfile:str, datafile:str) -> bool :
+    """
+    True if the given compiled file is of the current format version, and was compiled from
+    the current content of the given json dataset. The dataset is only hashed when its size
+    is as recorded but its modification time is not (e.g. it was touched, or checked out).
+    """
+    try:
+        with open(compiledfile,'rb') as fp:
+            header = fp.read(HEADER.size)
+        stat = os.stat(datafile)
+    except OSError:
+        return False
+    if len(header) < HEADER.size:
+        return False
+    (magic, version, numOfTasks, indexOffset, size, mtime, digest) = HEADER.unpack(header)
+    if magic != MAGIC or version != FORMAT_VERSION or size != stat.st_size:
+        return False
+    if mtime == stat.st_mtime_ns:
+        return True
+    h = hashlib.sha256()
+    with open(datafile,'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            h.update(chunk)
+    return h.digest() == digest
+
+
+def select_task_ids(ids:list, taskIds:list=None, indexRange:tuple=None, pattern:str=None,
+                    sampleSize:int=None, seed:int=None) -> list :
+    """
+    Select task-ids from the given list (of all task-ids in a dataset, in their order).
+    The filters, which are applied in this order, are:
+
+       taskIds    : only these tasks; a KeyError is raised if one does not exist.
+       indexRange : a pair (start,end); only the tasks in the positions start..end-1.
+       pattern    : only the tasks whose id matches this regular expression (re.search).
+       sampleSize : only a random sample of this many of the remaining tasks (or all of
+                    them if there are fewer), drawn with the given seed.
+
+    The selected ids keep their order in the dataset.
+    """
+    if taskIds != None:
+        missing = [ Tid for Tid in taskIds if not Tid in ids ]
+        if len(missing) > 0:
+            raise KeyError(f"tasks not in the dataset: {missing}")
+        wanted = set(taskIds)
+        ids = [ Tid for Tid in ids if Tid in wanted ]
+    if indexRange != None:
+        (start,end) = indexRange
+        ids = ids[start:end]
+    if pattern != None:
+        regex = re.compile(pattern)
+        ids = [ Tid for Tid in ids if regex.search(Tid) ]
+    if sampleSize != None and sampleSize < len(ids):
+        chosen = set(random.Random(seed).sample(ids, sampleSize))
+        ids = [ Tid for Tid in ids if Tid in chosen ]
+    return ids
+
+
+class CompiledDataset:
+    """
+    A compiled dataset, opened for reading. Only the index is read when opening; a task
+    is parsed from its record when it is accessed, e.g. with dataset[taskId].
+    """
+    def __init__(self, filename:str):
+        self.fp = open(filename,'rb')
+        self.mm = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, numOfTasks, indexOffset) = HEADER.unpack_from(self.mm, 0)[:4]
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{filename} is not a compiled dataset of version {FORMAT_VERSION}")
+        # task-id -> (offset,length) of its record, in the order of the dataset:
+        self.index = {}
+        pos = indexOffset
+        for k in range(numOfTasks):
+            (offset, length, idLength) = INDEX_ENTRY.unpack_from(self.mm, pos)
+            pos += INDEX_ENTRY.size
+            Tid = self.mm[pos : pos + idLength].decode('utf-8')
+            pos += idLength
+            self.index[Tid] = (offset,length)
+
+    def ids(self) -> list :
+        return list(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, Tid):
+        return Tid in self.index
+
+    def __getitem__(self, Tid) -> Dict :
+        (offset,length) = self.index[Tid]
+        return json.loads(self.mm[offset : offset + length])
+
+    def read(self, ids:list=None) -> Dict[str,Dict] :
+        """
+        Parse the given tasks (by default all of them) and return them as a dictionary
+        task-id -> task.
+        """
+        if ids == None: ids = self.ids()
+        return { Tid : self[Tid] for Tid in ids }
+
+    def close(self):
+        self.mm.close()
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("usage: python compiledDataset.py <dataset.json> [<compiled-file>]")
+        sys.exit(1)
+    compiledfile = compile_dataset(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    with CompiledDataset(compiledfile) as D:
+        print(f"** {len(D)} tasks compiled to {compiledfile}")
@@ -2,25 +2,160 @@ from typing import Iterable, Dict
 import gzip
 import json
 import os
+import threading
+
+from compiledDataset import CompiledDataset, compiled_file, is_compiled, is_up_to_date, select_task_ids
 
 
 ROOT = os.path.dirname(os.path.abspath(__file__))
 ZEROSHOT_DATA = os.path.join(ROOT, "..", "data", "specification_zeroshot_inputs.json")
 
-def read_problems(data_file: str) -> Dict[str, Dict]:
+def read_problems(data_file: str, taskIds: list = None, indexRange: tuple = None, pattern: str = None,
+                  sampleSize: int = None, seed: int = None) -> Dict[str, Dict]:
     """
-    Parses data file content to task dictionary
+    Parses data file content to task dictionary. Only the tasks selected by the filters
+    are returned (see compiledDataset.select_task_ids); by default all.
+
+    The data file is either a json dataset or a compiled one (see compiledDataset.py). For
+    a json dataset, its compiled version is used instead if there is one that is up to date.
+    From a compiled dataset only the selected tasks are parsed.
     """
-    return {task["task_id"]: task for task in stream_json(data_file)}
+    data_file = prefer_compiled(data_file)
+    if is_compiled(data_file):
+        with CompiledDataset(data_file) as D:
+            return D.read(select_task_ids(D.ids(), taskIds, indexRange, pattern, sampleSize, seed))
+    tasks = {task["task_id"]: task for task in stream_json(data_file)}
+    ids = select_task_ids(list(tasks), taskIds, indexRange, pattern, sampleSize, seed)
+    return { Tid: tasks[Tid] for Tid in ids }
+
 
+def read_problems_in_batches(data_file: str, batchSize: int, taskIds: list = None) -> Iterable[Dict[str, Dict]]:
+    """
+    As read_problems, but yields the tasks in batches of (at most) batchSize tasks, each as
+    a task dictionary. The tasks are read as the batches are asked for, so only one batch
+    is in memory at a time. If taskIds is given, only these tasks are read.
+    """
+    data_file = prefer_compiled(data_file)
+    if is_compiled(data_file):
+        with CompiledDataset(data_file) as D:
+            ids = select_task_ids(D.ids(), taskIds)
+            for k in range(0, len(ids), batchSize):
+                yield D.read(ids[k : k + batchSize])
+        return
+    wanted = None if taskIds == None else set(taskIds)
+    found = set()
+    batch = {}
+    for task in stream_json(data_file):
+        if wanted != None and not task["task_id"] in wanted: continue
+        found.add(task["task_id"])
+        batch[task["task_id"]] = task
+        if len(batch) == batchSize:
+            yield batch
+            batch = {}
+    if len(batch) > 0:
+        yield batch
+    if wanted != None and len(found) < len(wanted):
+        raise KeyError(f"tasks not in the dataset: {[ Tid for Tid in taskIds if not Tid in found ]}")
+
+
+def prefer_compiled(data_file: str) -> str :
+    """
+    Return the compiled version of the given json dataset, if there is one that is up to
+    date (see compiledDataset.is_up_to_date); else the dataset itself.
+    """
+    compiled = compiled_file(data_file)
+    if not is_compiled(data_file) and is_up_to_date(compiled, data_file):
+        return compiled
+    return data_file
+
+
+# the number of characters read at once by stream_json:
+CHUNK_SIZE = 1 << 16
 
 def stream_json(filename: str) -> Iterable[Dict]:
     """
-    Parses each the json-file describing the problems, and yields a list of problems,
-    each is described as a dictionary.
+    Parses the json-file describing the problems, and yields the problems one at a time,
+    each is described as a dictionary. The file (possibly gzipped) is either a json-list
+    of problems, or has one problem per line (jsonl). It is parsed incrementally, so only
+    the problem at hand is in memory, not the whole file.
+    """
+    decoder = json.JSONDecoder()
+    with open_file(filename, "rt") as fp:
+        buffer = ""
+        pos = 0
+        eof = False
+        # read at least the given number of characters more, unless the end of the file
+        # is reached; returns False if there is nothing more to read:
+        def readMore(size):
+            nonlocal buffer, pos, eof
+            if eof: return False
+            chunk = fp.read(size)
+            if chunk == "": 
+                eof = True
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+        # skip the white space, and the separators of a json-list; returns the next
+        # character, or None at the end of the file:
+        def nextChar(separators):
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] in separators):
+                    pos += 1
+                if pos < len(buffer): return buffer[pos]
+                if not readMore(CHUNK_SIZE): return None
+
+        inList = nextChar("") == "["
+        if inList: pos += 1
+        while True:
+            c = nextChar("," if inList else "")
+            if c == None or (inList and c == "]"):
+                return
+            try:
+                (problem, end) = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # the problem is not complete in the buffer; it is read further, with
+                # as many characters as there are already, to not parse it too often:
+                if not readMore(max(CHUNK_SIZE, len(buffer) - pos)): raise
+                continue
+            if end == len(buffer) and not isinstance(problem, dict) and readMore(CHUNK_SIZE):
+                # e.g. a number that may continue in the next chunk
+                continue
+            pos = end
+            yield problem
+
+
+def open_file(filename: str, mode: str):
+    """
+    Open a file; if its name ends with .gz it is opened as a gzip-file.
+    """
+    filename = os.path.expanduser(filename)
+    if filename.endswith(".gz"):
+        return gzip.open(filename, mode)
+    return open(filename, mode)
+
+
+def stream_jsonl(filename: str) -> Iterable[Dict]:
     """
-    with open(filename, "r") as fp:
-        return json.load(fp)
+    Parses a jsonl (json-lines) file, possibly gzipped, and yields its items one at a time,
+    each as a dictionary.
+    """
+    with open_file(filename, "rb") as fp:
+        for line in fp:
+            if line.strip() != b"":
+                yield json.loads(line)
+
+
+def read_results(filename: str) -> Iterable[Dict]:
+    """
+    Read the results of an experiment, saved either as a json-file (a single list) or
+    as a jsonl-file (one task per line, possibly gzipped). The latter is read incrementally.
+    """
+    if filename.endswith(".json"):
+        with open(filename, "r") as fp:
+            return json.load(fp)
+    return stream_jsonl(filename)
 
 
 def write_jsonl(filename: str, data: Iterable[Dict], append: bool = False):
@@ -31,8 +166,7 @@ def write_jsonl(filename: str, data: Iterable[Dict], append: bool = False):
         mode = 'ab'
     else:
         mode = 'wb'
-    filename = os.path.expanduser(filename)
-    with open(filename, mode) as fp:
+    with open_file(filename, mode) as fp:
         for x in data:
             fp.write((json.dumps(x) + "\n").encode('utf-8'))
 
@@ -48,4 +182,31 @@ def write_json(filename: str, data: list[Dict], append: bool = False):
     with open(filename, mode) as fp:
         fp.write((json.dumps(data,indent=3)).encode('utf-8'))
 
-   
\ No newline at end of file
+
+class JsonlWriter:
+    """
+    Writes dictionaries, one at a time, to a jsonl (json-lines) file, gzipped if the file
+    name ends with .gz. Every item is written (and flushed) as soon as it is given, so
+    the items do not have to be kept in memory. Can be used from multiple threads.
+    """
+    def __init__(self, filename: str, append: bool = False):
+        self.fp = open_file(filename, 'ab' if append else 'wb')
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def write(self, x: Dict):
+        line = (json.dumps(x) + "\n").encode('utf-8')
+        with self.lock:
+            self.fp.write(line)
+            self.fp.flush()
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
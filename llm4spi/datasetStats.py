@@ -3,47 +3,44 @@
 #
 
 import os
-from data import ZEROSHOT_DATA, read_problems, write_jsonl
-from evaluation import listSplit
+from data import ZEROSHOT_DATA, stream_json, write_jsonl
+from testSuites import compile_test_suites
 
 def getNumOfTestCases(task:dict, type:str) -> dict :
     if not(f"{type}_condition_tests" in task) or task[f"{type}_condition_tests"] == "" :
        return { "base1":0, "base2":0, "validation":0, "all":0}
     
-    splitToken = '==='
-    test_cases0 = eval(task[f"{type}_condition_tests"])
-    test_suites = listSplit(test_cases0,splitToken)
-    if len(test_suites) == 1 :
-        base1 = len(test_suites[0])
-        base2 = 0
-        validation = 0
-    elif len(test_suites) == 2:
-        base1 = len(test_suites[0])
-        base2 = 0
-        validation = len(test_suites[1])
-    else: # so we have three suites
-        base1 = len(test_suites[0])
-        base2 = len(test_suites[1])
-        validation = len(test_suites[2])
+    test_suites = compile_test_suites(task[f"{type}_condition_tests"])
+    base1 = len(test_suites["base0"])
+    base2 = len(test_suites["base1"])
+    validation = len(test_suites["validation"])
     all = base1 + base2 + validation
     R = { "base1":base1, "base2":base2, "validation":validation, "all":all}
-    print(f">>> {task["task_id"]}: {R}")
+    print(f">>> {task['task_id']}: {R}")
     return R
 
 def printStats(datafile:str):
-  tasks = read_problems(datafile)
-  tasks = tasks.values()
-  N = len(tasks)
-  numberOfPreCond  = len([ 1 for T in tasks if "pre_condition" in T and T["pre_condition"] != "" ])
-  numberOfPostCond = len([ 1 for T in tasks if "post_condition" in T and T["post_condition"] != "" ])
-  totNumTestCasesPreCond  = sum([ getNumOfTestCases(T,"pre")["all"] for T in tasks ])
-  totNumTestCasesPostCond = sum([ getNumOfTestCases(T,"post")["all"] for T in tasks ])
-  totNumBase1TestCasesPreCond  = sum([ getNumOfTestCases(T,"pre")["base1"] for T in tasks ])
-  totNumBase1TestCasesPostCond = sum([ getNumOfTestCases(T,"post")["base1"] for T in tasks ])
-  totNumBase2TestCasesPreCond  = sum([ getNumOfTestCases(T,"pre")["base2"] for T in tasks ]) 
-  totNumBase2TestCasesPostCond = sum([ getNumOfTestCases(T,"post")["base2"] for T in tasks ]) 
-  totNumValidationTestCasesPreCond  = sum([ getNumOfTestCases(T,"pre")["validation"] for T in tasks ]) 
-  totNumValidationTestCasesPostCond = sum([ getNumOfTestCases(T,"post")["validation"] for T in tasks ]) 
+  # the tasks are streamed, and only their counts are kept; so the dataset does not
+  # have to fit in memory:
+  N = 0
+  numberOfPreCond  = 0
+  numberOfPostCond = 0
+  preCounts  = []
+  postCounts = []
+  for T in stream_json(datafile):
+    N += 1
+    if "pre_condition" in T and T["pre_condition"] != "" : numberOfPreCond += 1
+    if "post_condition" in T and T["post_condition"] != "" : numberOfPostCond += 1
+    preCounts.append(getNumOfTestCases(T,"pre"))
+    postCounts.append(getNumOfTestCases(T,"post"))
+  totNumTestCasesPreCond  = sum([ R["all"] for R in preCounts ])
+  totNumTestCasesPostCond = sum([ R["all"] for R in postCounts ])
+  totNumBase1TestCasesPreCond  = sum([ R["base1"] for R in preCounts ])
+  totNumBase1TestCasesPostCond = sum([ R["base1"] for R in postCounts ])
+  totNumBase2TestCasesPreCond  = sum([ R["base2"] for R in preCounts ]) 
+  totNumBase2TestCasesPostCond = sum([ R["base2"] for R in postCounts ]) 
+  totNumValidationTestCasesPreCond  = sum([ R["validation"] for R in preCounts ]) 
+  totNumValidationTestCasesPostCond = sum([ R["validation"] for R in postCounts ]) 
 
   print("=== Stats of " + datafile)
   print(f"  * #tasks:{N}")
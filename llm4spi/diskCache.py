@@ -0,0 +1,157 @@
+#
+# A simple persistent key-value store, used to cache expensive results (e.g. responses of
+# an LLM) across runs. The store is an SQLite database in WAL-mode, so that multiple
+# processes (and threads) can safely use the same cache file at the same time.
+#
+# The cache has a maximum size (in bytes, counting the stored values). When it grows
+# beyond that, the least recently used entries are evicted. The total size is kept in a
+# separate one-row table, updated together with the entries, so that checking it does not
+# need to scan all the entries.
+#
+import sqlite3
+import threading
+import time
+
+
+class PersistentCache:
+    """
+    A persistent key-value cache, stored in an SQLite database file. Keys are strings
+    and values are bytes.
+
+    The schemaVersion identifies the format of the stored values. When an existing cache
+    file has a different schema version, its content is discarded.
+    """
+    def __init__(self, dbfile:str, maxBytes:int, schemaVersion:int = 1):
+        self.dbfile = dbfile
+        self.maxBytes = maxBytes
+        self.schemaVersion = schemaVersion
+        # sqlite-connections cannot be shared between threads, so every thread gets its own:
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        conn = self.connection()
+        with conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != schemaVersion:
+                conn.execute("DROP TABLE IF EXISTS entries")
+                conn.execute("DROP TABLE IF EXISTS total")
+            conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                               key TEXT PRIMARY KEY,
+                               value BLOB NOT NULL,
+                               size INTEGER NOT NULL,
+                               last_access REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS total (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL)")
+            # a cache file made before the total was kept gets it computed once:
+            conn.execute("INSERT OR IGNORE INTO total (id,size) SELECT 0, COALESCE(SUM(size),0) FROM entries")
+            conn.execute(f"PRAGMA user_version = {int(schemaVersion)}")
+
+    def connection(self) -> sqlite3.Connection :
+        conn = getattr(self.local, "conn", None)
+        if conn == None:
+            conn = sqlite3.connect(self.dbfile, timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key:str) -> bytes :
+        """
+        Return the value associated to the key, or None if the cache has no entry for it.
+        """
+        conn = self.connection()
+        with conn:
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row == None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, key:str, value:bytes) :
+        """
+        Associate the value to the key, then evict least recently used entries if the
+        cache has become too large.
+        """
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self.insert(conn, key, value, time.time())
+        self.evict()
+
+    def getMany(self, keys:list) -> dict :
+        """
+        Return the values associated to the given keys, as a dictionary that only has the
+        keys that are in the cache.
+        """
+        conn = self.connection()
+        values = {}
+        now = time.time()
+        with conn:
+            for key in keys:
+                row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+                if row == None:
+                    self.misses += 1
+                    continue
+                conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                values[key] = row[0]
+        return values
+
+    def putMany(self, items:dict) :
+        """
+        As put, for all the key-value pairs in the given dictionary at once.
+        """
+        if len(items) == 0: return
+        conn = self.connection()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for (key,value) in items.items():
+                self.insert(conn, key, value, now)
+        self.evict()
+
+    def insert(self, conn:sqlite3.Connection, key:str, value:bytes, now:float) :
+        """
+        Insert or replace an entry, and update the total size accordingly. To be called
+        within a write transaction, so that no other process changes the entry meanwhile.
+        """
+        row = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        oldSize = 0 if row == None else row[0]
+        conn.execute("INSERT OR REPLACE INTO entries (key,value,size,last_access) VALUES (?,?,?,?)",
+                     (key, value, len(value), now))
+        conn.execute("UPDATE total SET size = size + ? WHERE id = 0", (len(value) - oldSize,))
+
+    def evict(self) :
+        """
+        Remove the least recently used entries until the total size of the stored
+        values is at most maxBytes.
+        """
+        conn = self.connection()
+        if self.totalSize(conn) <= self.maxBytes:
+            return
+        with conn:
+            # check again in a write transaction, as another process may have evicted already:
+            conn.execute("BEGIN IMMEDIATE")
+            totalSize = self.totalSize(conn)
+            if totalSize <= self.maxBytes: 
+                return
+            toRemove = []
+            removedSize = 0
+            for (key,size) in conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+                if totalSize - removedSize <= self.maxBytes: break
+                toRemove.append((key,))
+                removedSize = removedSize + size
+            conn.executemany("DELETE FROM entries WHERE key = ?", toRemove)
+            conn.execute("UPDATE total SET size = size - ? WHERE id = 0", (removedSize,))
+
+    def totalSize(self, conn:sqlite3.Connection = None) -> int :
+        """
+        Return the total size of the stored values.
+        """
+        conn = self.connection() if conn == None else conn
+        return conn.execute("SELECT size FROM total WHERE id = 0").fetchone()[0]
+
+    def __len__(self) :
+        return self.connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
@@ -12,6 +12,7 @@ from google import genai
 from google.genai import types
 
 from openai4spi import PromptResponder, generate_results
+from rateLimiter import getRateLimiter
 
 class GoogleResponder(PromptResponder):
     """
@@ -25,21 +26,12 @@ class GoogleResponder(PromptResponder):
         PromptResponder.__init__(self)
         self.client = client
 
-        # to exceed num of request  per minute
-        self.last_time_seen = -1
-        # to set as parameters
-        self.rpm_limit = rpm_limit
-        self.tpm_limit = tpm_limit
-        self.rpd_limit = rpd_limit
-        # used resources
-        self.rpm_used = 0
-        self.tpm_used = 0
-        self.rpd_used = 0
-        # timers for minutes and days
-        self.minute_timer = 0
-        self.day_timer = 0
+        # the limits are shared by all clients of the same model:
+        self.rateLimiter = getRateLimiter(f"gemini/{modelId}", rpm=rpm_limit, tpm=tpm_limit, rpd=rpd_limit)
         # save model name
         self.model_id = modelId
+        self.model = modelId
+        self.maxTokens = 1024
 
 
     def completeIt(self, multipleAnswer: int, prompt: str) -> list[str]:
@@ -49,68 +41,23 @@ class GoogleResponder(PromptResponder):
 
         # Google client configuration
         cfg = types.GenerateContentConfig(
-            temperature=0.7,
-            max_output_tokens=1024
+            temperature=self.temperature,
+            max_output_tokens=self.maxTokens
         )
 
-        # first call
-        if self.last_time_seen == -1:
-            self.last_time_seen = time.time()
-            passed_time = 0
-        else:
-            # time passed since the last call
-            passed_time = time.time() - self.last_time_seen
-
-        # More than one minute is passed
-        if passed_time > 60:
-            # reset minute counters
-            self.minute_timer = 0
-            self.rpd_used = 0
-            self.tpm_used = 0
-
-        # One day is passed
-        if passed_time > 60 * 60 * 24:
-            # reset day counters
-            self.day_timer = 0
-            self.rpd_used = 0
-
         # estimate token usage
         prompt_tokens = self.client.models.count_tokens(model=self.model_id, contents=prompt)
 
-
         # iterate
         for k in range(multipleAnswer):
-
-            # check if free resource are consumed
-            if self.rpm_used + 1 >= self.rpm_limit or self.tpm_used + prompt_tokens.total_tokens + 1 >= self.tpm_limit :
-                sleep_time = max(1,60 - self.minute_timer)
-                if self.DEBUG: print(f">>> sleep {sleep_time}s\n" )
-                time.sleep(sleep_time)
-                self.rpm_used = 0
-                self.tpm_used = 0
-                self.minute_timer = 0
-
-            # rpd finished
-            if self.rpd_used >= self.rpd_limit :
-                sleep_time = max(1, ( 60 * 60 * 12) - self.day_timer)
-                if self.DEBUG: print(f">>> sleep {sleep_time}s\n")
-                time.sleep(sleep_time)
-                self.rpd_used = 0
-                self.day_timer = 0
-
-            t0 = time.time()
+            # wait until the request fits in the limits; we reserve for the worst case, the 
+            # actual usage is recorded once we have the answer:
+            reservation = self.rateLimiter.acquire(prompt_tokens.total_tokens + self.maxTokens, debug=self.DEBUG)
             response = self.client.models.generate_content( model = self.model_id, contents = prompt, config = cfg )
-            used_time = time.time() - t0
-            self.minute_timer += used_time
-            self.day_timer += used_time
-            self.rpm_used += 1
-            self.rpd_used += 1
-            self.tpm_used += response.usage_metadata.total_token_count
-
             usage_data = response.usage_metadata
+            self.rateLimiter.record(reservation, usage_data.total_token_count if usage_data != None else None)
             answers.append(response.text)
 
-        self.last_time_seen = time.time()
         return answers
 
 
@@ -12,6 +12,7 @@ import os
 import time
 
 from openai4spi import PromptResponder, generate_results
+from rateLimiter import getRateLimiter, estimateTokens
 
 #
 # Groq actually has its own client-side API, but we will use OpenAI API since this is
@@ -21,17 +22,17 @@ class MyGroqClient(PromptResponder):
     """
     An instance of prompt-responder that uses an LLM available at Groq as the backend model.
     """
-    def __init__(self,client: OpenAI, modelId:str):
+    def __init__(self,client: OpenAI, modelId:str, rpm_limit:int = None, tpm_limit:int = 6000, rpd_limit:int = None):
         """
-        Expecting an OpenAI-client.
+        Expecting an OpenAI-client. The limits are those of Groq's plan; by default only
+        the tokens per minute are limited (6000, pfff :( ). The limiter is shared by all 
+        clients of the same model.
         """
         PromptResponder.__init__(self)
         self.client = client
         self.model = modelId
-        # to keep track of time, towards deciding to pause so as not
-        # to exceed num of tokens/minute 
-        self.t0 = None
-        self.maxNumOfTokensPerMiniteLIMIT = 6000 # pfff :(
+        self.maxTokens = 1024
+        self.rateLimiter = getRateLimiter(f"groq/{modelId}", rpm=rpm_limit, tpm=tpm_limit, rpd=rpd_limit)
     
     def completeIt(self, multipleAnswer:int, prompt:str) -> list[str] :
         if self.DEBUG: print(">>> PROMPT:\n" + prompt)
@@ -39,14 +40,13 @@ class MyGroqClient(PromptResponder):
         # Groq-side does not currently support multiple answers; so we will explicitly ask one at a time.
         #
         responses = []
-        if self.t0 == None:
-            self.t0 = time.time()
-        totTokensSinceLastPause = 0
         for k in range(multipleAnswer):
+            # reserve for the worst case, the actual usage is recorded once we have the answer:
+            reservation = self.rateLimiter.acquire(estimateTokens(prompt) + self.maxTokens, debug=self.DEBUG)
             completion = self.client.chat.completions.create(
                 model = self.model,
-                temperature=0.7,
-                max_tokens=1024,
+                temperature=self.temperature,
+                max_tokens=self.maxTokens,
                 # n = ... ,
                 messages=[
                     {
@@ -55,20 +55,12 @@ class MyGroqClient(PromptResponder):
                     }
                     ]
                 )
+            usedTokens = completion.usage.total_tokens if completion.usage != None else None
+            self.rateLimiter.record(reservation, usedTokens)
             R = completion.choices[0].message.content
-            estimatedNumOfTokens = 3* len(R.split())
             responses.append(R)
             if self.DEBUG: 
-                print(f">>> raw response {k} (estimated #tokens {estimatedNumOfTokens}):\n {R}")
-            totTokensSinceLastPause = totTokensSinceLastPause + estimatedNumOfTokens
-            timeSinceLastPause = time.time() - self.t0
-            if multipleAnswer>1 and timeSinceLastPause >= 0.8*60 or totTokensSinceLastPause >= 0.8 * self.maxNumOfTokensPerMiniteLIMIT:
-                # add pause untill one minute over:
-                sleepTime = max(5,60 - timeSinceLastPause)
-                if self.DEBUG: 
-                    print(f">>> SLEEPING {sleepTime}s ...")
-                self.t0 = time.time()
-                time.sleep
+                print(f">>> raw response {k} (#tokens {usedTokens}):\n {R}")
 
         return responses
     
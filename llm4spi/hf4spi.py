@@ -24,6 +24,7 @@ class MyHugginface_Client(PromptResponder):
         PromptResponder.__init__(self)
         self.client = client
         self.model = modelId 
+        self.maxTokens = 1024
 
     def completeIt(self, multipleAnswer:int, prompt:str) -> list[str]:
         if self.DEBUG: print(">>> PROMPT:\n" + prompt)
@@ -36,8 +37,8 @@ class MyHugginface_Client(PromptResponder):
             # they keep giving the same answer despite the repeat-penalty
             completion = self.client.chat.completions.create(
                 model = self.model,
-                temperature=0.7,
-                max_tokens=1024,
+                temperature=self.temperature,
+                max_tokens=self.maxTokens,
                 # n = ... ,  --> Not supported by HF :(
                  messages=[
                     {
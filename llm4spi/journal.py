@@ -0,0 +1,115 @@
+#
+# An append-only journal of an experiment run. As soon as the generation (the AI completions)
+# or the evaluation of a task is finished, its results are appended to the journal, as a
+# single json-line. If the run crashes, it can be resumed from the journal: tasks whose 
+# generation and/or evaluation are in the journal do not have to be done again.
+#
+from typing import Dict
+import json
+import os
+import threading
+
+CONDTYPES = ["pre","post"]
+
+# the task-entries produced by the generation of a task, and by its evaluation:
+GENERATION_FIELDS = [ f"{condTy}_condition_{field}" for condTy in CONDTYPES 
+                                                   for field in ["prompt","raw_responses","completions"] ]
+EVALUATION_FIELDS = [ f"{condTy}_condition_{field}" for condTy in CONDTYPES 
+                                                   for field in ["ResultsSummary","reference_TestResults","candidates_TestResults","timeouts"] ]
+
+
+class ExperimentJournal:
+    """
+    The journal of an experiment, kept in a jsonl-file. The first line is a header that
+    describes the run (e.g. the dataset, the model and its sampling parameters, and the
+    number of answers asked per prompt). Every 
+    next line is the record of a task, for either its generation or its evaluation stage.
+
+    If resume is true and the file already exists with the same header, its records are
+    loaded and can be restored into the tasks. Otherwise the journal is started anew.
+    """
+    def __init__(self, filename:str, header:Dict, resume:bool = False):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.generated = {}
+        self.evaluated = {}
+        if resume and os.path.exists(filename):
+            self.load(header)
+        else:
+            with open(filename,'w') as fp:
+                fp.write(json.dumps({ "stage" : "header", **header }) + "\n")
+        
+    def load(self, header:Dict) :
+        with open(self.filename,'rb+') as fp:
+            content = fp.read()
+            # if the run was killed while writing a line, the journal ends with a partial
+            # line; it is cut off, else the next record would be appended to it:
+            end = content.rfind(b"\n") + 1
+            if end < len(content):
+                fp.truncate(end)
+        records = []
+        for line in content[:end].decode("utf-8").splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        if len(records) == 0 or records[0] != { "stage" : "header", **header }:
+            print(f">>> The journal {self.filename} belongs to a different run; starting anew.")
+            with open(self.filename,'w') as fp:
+                fp.write(json.dumps({ "stage" : "header", **header }) + "\n")
+            return
+        for R in records[1:]:
+            if R["stage"] == "generation":
+                self.generated[R["task_id"]] = R
+                # an evaluation of an older generation is no longer valid:
+                self.evaluated.pop(R["task_id"],None)
+            elif R["stage"] == "evaluation":
+                self.evaluated[R["task_id"]] = R
+        print(f">>> Resuming from {self.filename}: {len(self.generated)} tasks generated, {len(self.evaluated)} evaluated.")
+
+    def append(self, record:Dict) :
+        line = json.dumps(record) + "\n"
+        with self.lock:
+            with open(self.filename,'a') as fp:
+                fp.write(line)
+                fp.flush()
+                os.fsync(fp.fileno())
+
+    def recordGeneration(self, task:Dict) :
+        """
+        Append the AI completions of the task to the journal.
+        """
+        R = { "stage" : "generation", "task_id" : task["task_id"] }
+        for field in GENERATION_FIELDS: R[field] = task.get(field)
+        self.append(R)
+
+    def recordEvaluation(self, task:Dict) :
+        """
+        Append the evaluation results of the task to the journal.
+        """
+        R = { "stage" : "evaluation", "task_id" : task["task_id"] }
+        for field in EVALUATION_FIELDS: R[field] = task.get(field)
+        self.append(R)
+
+    def restoreGeneration(self, task:Dict) -> bool :
+        """
+        If the journal has the AI completions of the task, put them into the task-dictionary
+        and return True. Else return False.
+        """
+        R = self.generated.get(task["task_id"])
+        if R == None:
+            # the task will be generated again, so any evaluation of it is stale: 
+            self.evaluated.pop(task["task_id"],None)
+            return False
+        for field in GENERATION_FIELDS: task[field] = R[field]
+        return True
+
+    def restoreEvaluation(self, task:Dict) -> bool :
+        """
+        If the journal has the evaluation results of the task, put them into the task-dictionary
+        and return True. Else return False.
+        """
+        R = self.evaluated.get(task["task_id"])
+        if R == None: return False
+        for field in EVALUATION_FIELDS: task[field] = R.get(field)
+        return True
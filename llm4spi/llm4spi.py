@@ -14,9 +14,13 @@ class MyGPT4ALL_Client(PromptResponder):
     """
     An instance of prompt-responder that uses a GPT4All's LLM as the backend model.
     """
-    def __init__(self, client:GPT4All):
+    def __init__(self, client:GPT4All, modelId:str = None):
         PromptResponder.__init__(self)
         self.client = client
+        # a local GPT4All model can only work on one prompt at a time:
+        self.maxConcurrency = 1
+        self.model = modelId
+        self.maxTokens = 1024
     
     def completeIt(self, multipleAnswer:int, prompt:str) -> list[str]:
         if self.DEBUG: print(">>> PROMPT:\n" + prompt)
@@ -26,8 +30,8 @@ class MyGPT4ALL_Client(PromptResponder):
             # they keep giving the same answer despite the repeat-penalty
             with self.client.chat_session():
                 A = self.client.generate(prompt, 
-                                temp=0.7,
-                                max_tokens=1024,
+                                temp=self.temperature,
+                                max_tokens=self.maxTokens,
                                 repeat_penalty=1.5
                                 #repeat_last_n=multipleAnswer
                                 )
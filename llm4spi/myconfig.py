@@ -1,3 +1,5 @@
+import os
+
 #
 # Test-cases of each task are typically split into a number of groups/test-suites/
 # For example, they could be grouped in two suites. The first consists of
@@ -17,6 +19,44 @@ CONFIG_USE_SECOND_TESTSUITE_AS_BASETESTS_TOO = True
 
 RUN_SINGLE_TESTCASE_TIMEOUT = 10 # in seconds
 
+# When True, the time-out of the test-cases of a suite is derived from the time the reference
+# solution needed for the slowest test-case of that suite: that time multiplied by 
+# TIMEOUT_MULTIPLIER, but at least TIMEOUT_FLOOR and at most TIMEOUT_CEILING seconds.
+# When False, RUN_SINGLE_TESTCASE_TIMEOUT is used. The chosen time-outs are recorded in the
+# task results (the field <pre/post>_condition_timeouts).
+ADAPTIVE_TIMEOUT = False
+TIMEOUT_MULTIPLIER = 1000
+TIMEOUT_FLOOR   = 0.5 # in seconds
+TIMEOUT_CEILING = RUN_SINGLE_TESTCASE_TIMEOUT
+
+# The total time (in seconds) a single candidate may spend on all its test-cases. Once it is
+# used up, the remaining test-cases of the candidate give "failed". None means no limit.
+CANDIDATE_TIME_BUDGET = None
+
+# How the time-out above is imposed when running test-cases on AI candidates:
+#   "thread" : every test-case is run in a separate thread, which is killed on time-out.
+#   "signal" : test-cases are run directly, and interrupted by a signal-timer on time-out.
+#              This is much cheaper, but only works in the main thread (on Unix).
+#   "auto"   : "signal" when possible, else "thread".
+#   "steps"  : as "auto", but a test-case is also stopped when it exceeds STEP_BUDGET steps
+#              (executed lines and jumps, see stepCounter.py). Unlike the time-out, this stops
+#              a runaway candidate at the same point on every machine, whatever its load, so 
+#              the time-out is then only a last resort (for code that loops inside C functions).
+#   "subprocess" : test-cases are run in a separate worker process, which is killed on time-out.
+#              This also stops candidates that are stuck in C code, which the other modes cannot
+#              interrupt. The worker is reused, so a new one is only started after a kill.
+#              The worker also imposes the resource limits below.
+TEST_EXECUTION_MODE = "auto"
+STEP_BUDGET = 1000000
+
+# Limits on the resources a candidate may use when its test-cases run in the "subprocess" mode
+# (on Unix): the memory (in bytes, on top of what the worker process itself uses), the CPU 
+# time (in seconds, per test-case), and the number of open files. None means no limit. A 
+# test-case that hits a limit gives a failure that says which limit, e.g. "failed: memory limit".
+CANDIDATE_MEMORY_LIMIT = 2 * 1024 * 1024 * 1024
+CANDIDATE_CPU_LIMIT = 10
+CANDIDATE_MAX_OPEN_FILES = 64
+
 # When "true", this will cause cases where AI pre/post-condition returns a None to be 
 # interpreted as "I don't know", and will be ignored in the evaluation against expected
 # return-value. E.g. this could be case when the AI has been explicitly instructred to indicate
@@ -26,3 +66,52 @@ RUN_SINGLE_TESTCASE_TIMEOUT = 10 # in seconds
 # conditon from AI is expected to return only a true or a false, and not any other type of
 # value.
 IGNORE_NONE_PREDICTION = False
+
+# When True, running the test-cases of a suite on a candidate stops as soon as the 
+# candidate's verdict on that suite can no longer change, e.g. when it already crashed on
+# a test-case. The rest of the suite is then skipped (and recorded as "skipped"), and if
+# the verdict on the base tests is already final after base0, base1 is skipped too.
+# Only a failure is final (any other verdict turns into "failed" on a later crash), so
+# this gives the same verdicts as running all test-cases.
+EARLY_EXIT = False
+
+# When True, candidates of a task that are the same modulo layout, comments, and docstrings 
+# (they have the same AST) are evaluated only once; the others get a copy of the results,
+# and a field "duplicateOf" with the nr of the candidate they are a copy of.
+DEDUPLICATE_CANDIDATES = True
+
+# When True, the candidates of a task are clustered on their behavior: all candidates are 
+# run on a small set of probe test-cases first (CLUSTER_PROBE_SIZE of them), and those with
+# the same results on the probes form a cluster. Only one candidate per cluster is run on 
+# all tests; the others are run on a few randomly chosen test-cases (CLUSTER_SPOT_CHECKS) 
+# to confirm they behave the same, and then get a copy of its results. A candidate that
+# fails the spot checks is run on all tests after all.
+# This is an approximation (a candidate may differ from its cluster on tests that were not
+# checked), meant for experiments with many samples per task. The clusters are reported in
+# the task's results summary.
+CLUSTER_CANDIDATES = False
+CLUSTER_PROBE_SIZE = 5
+CLUSTER_SPOT_CHECKS = 3
+
+# The file (an sqlite database) in which the results of running the test suites on the 
+# reference solutions are cached, so that they can be reused across experiments. The path
+# is relative to the working directory. Set to None to disable the cache.
+REFERENCE_RESULTS_CACHE_FILE = os.path.join("cache", "referenceResults.sqlite")
+REFERENCE_RESULTS_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# The file (an sqlite database) in which the results of running the test suites on AI
+# candidates are cached, so that the same candidate (e.g. from another model) is not run
+# again in later experiments (see verdictCache.py). The cache is opt-in: it is disabled
+# (None) by default; set it to e.g. os.path.join("cache", "candidateResults.sqlite") to use it.
+# When the cache grows beyond the given size, the least recently used entries are removed.
+VERDICT_CACHE_FILE = None
+VERDICT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# The maximum size (in bytes) of the persistent cache of LLM responses (see responseCache.py).
+# When the cache grows larger, the least recently used responses are removed.
+RESPONSE_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# When the evaluation is run in a pool of worker processes (see parallelEvaluate.py), every
+# worker is replaced by a fresh one after evaluating this many tasks, to keep the memory
+# used by the workers bounded.
+EVALUATION_WORKER_MAX_TASKS = 50
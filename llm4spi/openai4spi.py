@@ -5,19 +5,42 @@
 
 from datetime import datetime
 from typing import Dict, List
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+import asyncio
 import os
+import queue
+import threading
 import time
 
-from data import read_problems, write_json
+from data import read_problems, read_problems_in_batches, write_json, JsonlWriter
+from columnarResults import write_columnar
 from prompting import create_prompt
-from basicEvaluate import evaluate_tasks_results
+from testSuites import load_suite_store, forget_test_suites
+from basicEvaluate import evaluate_task_result, evaluate_tasks_results, write_evaluation_summaries, execution_stats
+from rateLimiter import estimateTokens
+from journal import ExperimentJournal
+from parallelEvaluate import EvaluationPool, evaluate_tasks_results_parallel
 from pythonSrcUtils import extractFunctionBody, extractPythonFunctionDef_fromMarkDownQuote, fix_indentation
 
+# the formats in which generate_results can save the results:
+RESULTS_FORMATS = ["json", "jsonl", "jsonl.gz", "npz"]
+
+
 class PromptResponder:
 
     def __init__(self) :
         self.DEBUG = False
+        # the maximum number of prompts this responder can handle at the same time,
+        # when used by the concurrent generation engine. None means no limit (other
+        # than the one imposed by the engine itself).
+        self.maxConcurrency = None
+        # the name of the model, and the sampling parameters used when prompting it:
+        self.model = None
+        self.temperature = 0.7
+        self.maxTokens = None
+        # an optional rate-limiter (see rateLimiter.py), shared with other responders
+        # that use the same provider:
+        self.rateLimiter = None
 
     """
     A template class that generically represents an LLM/AI that can respond to a prompt 
@@ -32,6 +55,28 @@ class PromptResponder:
         """
         return None
 
+    async def completeItAsync(self, multipleAnswer:int, prompt:str) -> list[str]:
+        """
+        The asynchronous variant of completeIt, used by the concurrent generation engine.
+        By default it just runs completeIt in a worker thread. Subclasses that have an
+        asynchronous client available can override this to avoid using threads.
+        """
+        return await asyncio.to_thread(self.completeIt, multipleAnswer, prompt)
+
+    def generationParams(self) -> Dict :
+        """
+        Return the parameters that determine the answers of this responder, e.g. 
+        to identify cached answers (see responseCache.py). These should be the values
+        that are actually sent to the model; a subclass that sends other values than
+        its attributes (e.g. a fixed temperature for some models) overrides this.
+        """
+        return { 
+            "provider" : type(self).__name__,
+            "model" : self.model,
+            "temperature" : self.temperature,
+            "max_tokens" : self.maxTokens
+            }
+
 def generate_results(
         AI : PromptResponder, 
         datafile:str,
@@ -39,7 +84,15 @@ def generate_results(
         experimentName:str,
         enableEvaluation: bool,
         allowMultipleAnswers: int,
-        prompt_type: str        
+        prompt_type: str,
+        maxConcurrency: int = 1,
+        pipelined: bool = False,
+        pipelineQueueSize: int = 4,
+        numOfEvaluationWorkers: int = 1,
+        resume: bool = False,
+        resultsFormat: str = "json",
+        numOfEvaluationProcesses: int = 1,
+        batchSize: int = None
         )  :
     """
     The general API for evaluating an LLM/AI in its ability to construct pre- and post-conditions
@@ -74,52 +127,135 @@ def generate_results(
        * (5) rejected: none of the above judgement is the case.
 
     An evaluation report, along with the produced solutions from the AI are saved in files in /results.
+
+    If maxConcurrency is more than 1, the prompts of different tasks, and of the pre- and 
+    post-conditions, are sent to the AI concurrently, with at most maxConcurrency prompts
+    in flight at the same time (see generate_completions_concurrently).
+
+    If pipelined is true (and evaluation is enabled), the evaluation of a task starts as soon
+    as its completions are generated, while the completions of the next tasks are still being
+    generated (see generate_and_evaluate_pipelined).
+
+    As soon as the generation or the evaluation of a task is done, its results are appended
+    to a journal (results/<experimentName>_journal_<prompt_type>.jsonl). If resume is true, the
+    tasks whose generation and/or evaluation are in the journal, from a previous run of the 
+    same experiment, are not generated and/or evaluated again.
+
+    The resultsFormat is either json, jsonl, jsonl.gz, or npz. With json, the results of all tasks are
+    saved at the end, as a single json-list. With jsonl(.gz), the results of every task are
+    saved as a single line as soon as the task is done, after which they are released from
+    memory. Only the task summaries are kept till the end, for the summary reports. With npz,
+    the results are saved at the end in the compact, columnar format of columnarResults.py.
+
+    If numOfEvaluationProcesses is more than 1, the evaluation is done by a pool of that many 
+    worker processes (see parallelEvaluate.py).
+
+    If batchSize is given, the dataset is streamed: it is read and processed in batches of that
+    many tasks. With a jsonl(.gz) resultsFormat, a batch is reduced to its summaries once it is
+    done, so datasets larger than the memory can be processed.
     """
+    if resultsFormat not in RESULTS_FORMATS:
+        raise ValueError(f"unknown resultsFormat {resultsFormat}; it should be one of {RESULTS_FORMATS}")
     time0 = time.time()
-    tasks = read_problems(datafile)
-    timeSpentReadingData = time.time() - time0
+    taskIds = None if specificProblem == None else [ specificProblem ]
+    if batchSize == None:
+        batches = iter([ read_problems(datafile, taskIds=taskIds) ])
+    else:
+        batches = read_problems_in_batches(datafile, batchSize, taskIds=taskIds)
 
-    if specificProblem != None:
-        tasks = { specificProblem : tasks[specificProblem] }
-
-    time1 = time.time()
-    for task in tasks:
-        generate_completions(AI, tasks[task], allowMultipleAnswers, prompt_type=prompt_type)
-    timeSpentAI = time.time() - time1
+    journal = ExperimentJournal(f"results/{experimentName}_journal_{prompt_type}.jsonl",
+                                { "datafile" : os.path.basename(datafile),
+                                  "specificProblem" : specificProblem,
+                                  "allowMultipleAnswers" : allowMultipleAnswers, 
+                                  "prompt_type" : prompt_type,
+                                  # the model and its sampling parameters, e.g. to not resume
+                                  # with the answers of another model:
+                                  **AI.generationParams() },
+                                resume=resume)
 
     current_date = (datetime.now()).strftime("%d_%m_%Y_%H_%M_%S")
+    reportfile_basename = f"results/{experimentName}_evaluation_{prompt_type}_{current_date}"
+    resultsfile = f"results/{experimentName}_all_{prompt_type}_{current_date}.{resultsFormat}"
+
+    writer = None
+    onTaskDone = None
+    if resultsFormat not in ["json","npz"]:
+        writer = JsonlWriter(resultsfile)
+        def onTaskDone(task):
+            # save the task's results right away, then drop them from memory:
+            writer.write(mk_task_record(task,enableEvaluation))
+            release_task_results(task)
+
+    # all tasks that are done; in the batch mode with a jsonl-format, reduced to what the
+    # summaries need:
+    allTasks = {}
+    timeSpentReadingData = 0
+    timeSpentAI = 0
+    timeSpentAnalysis = 0
+    pipelineInfo = None
+    while True:
+        time1 = time.time()
+        tasks = next(batches, None)
+        timeSpentReadingData += time.time() - time1
+        if tasks == None: break
+        if enableEvaluation:
+            load_suite_store(datafile, tasks)
+
+        time1 = time.time()
+        batchPipelineInfo = None
+        if pipelined and enableEvaluation:
+            batchPipelineInfo = generate_and_evaluate_pipelined(AI, tasks, allowMultipleAnswers, prompt_type, 
+                                                           maxConcurrency, pipelineQueueSize, numOfEvaluationWorkers,
+                                                           journal=journal, onTaskEvaluated=onTaskDone,
+                                                           numOfEvaluationProcesses=numOfEvaluationProcesses)
+        elif maxConcurrency > 1:
+            asyncio.run(generate_completions_concurrently(AI, tasks, allowMultipleAnswers, prompt_type, maxConcurrency,
+                                                          journal=journal))
+        else:
+            for task in tasks:
+                if journal.restoreGeneration(tasks[task]): continue
+                generate_completions(AI, tasks[task], allowMultipleAnswers, prompt_type=prompt_type)
+                journal.recordGeneration(tasks[task])
+        if batchPipelineInfo == None:
+            timeSpentAI += time.time() - time1
+        else:
+            timeSpentAI += batchPipelineInfo["time AI"]
+            timeSpentAnalysis += batchPipelineInfo["time analysis"]
+            pipelineInfo = merge_pipeline_info(pipelineInfo, batchPipelineInfo)
+
+        time2 = time.time()
+        if enableEvaluation:
+            # then do the evaluation; in the pipelined mode this is already done. The
+            # summaries are written at the end, over all batches:
+            if batchPipelineInfo == None and numOfEvaluationProcesses > 1:
+                evaluate_tasks_results_parallel(tasks,reportfile_basename,numOfWorkers=numOfEvaluationProcesses,
+                                                journal=journal,onTaskEvaluated=onTaskDone,withSummaries=False)
+            elif batchPipelineInfo == None:
+                evaluate_tasks_results(tasks,reportfile_basename,journal=journal,onTaskEvaluated=onTaskDone,
+                                       withSummaries=False)
+        elif onTaskDone != None:
+            for Tid in tasks: onTaskDone(tasks[Tid])
+        timeSpentAnalysis += time.time() - time2
+
+        if batchSize != None and writer != None:
+            # the results of the batch are saved already
+            forget_test_suites(tasks)
+            tasks = { Tid : reduce_to_summaries(tasks[Tid]) for Tid in tasks }
+        allTasks.update(tasks)
 
     time2 = time.time()
-    reportfile_basename = f"results/{experimentName}_evaluation_{prompt_type}_{current_date}"
-    # gathering AI raw-responses and extracted completions:
-    results = [{
-            "task_id": tasks[Tid]["task_id"],
-            "pre_condition_prompt" : tasks[Tid]["pre_condition_prompt"],
-            "pre_condition_raw_responses": tasks[Tid]["pre_condition_raw_responses"],
-            "pre_condition_completions": tasks[Tid]["pre_condition_completions"],
-            "post_condition_prompt" : tasks[Tid]["post_condition_prompt"],
-            "post_condition_raw_responses": tasks[Tid]["post_condition_raw_responses"],
-            "post_condition_completions": tasks[Tid]["post_condition_completions"]
-            } for Tid in tasks]
-    
     if enableEvaluation:
-        # then do the evaluation
-        evaluate_tasks_results(tasks,reportfile_basename)
-        # add the eval-summaries and raw-test-results into the results:
-        for R in results :
-            Tid = R["task_id"]
-            task = tasks[Tid]
-            condTypes = ["pre","post"]
-            for condTy in condTypes:
-               R[f"{condTy}_condition_ResultsSummary"] = task[f"{condTy}_condition_ResultsSummary"]
-               R[f"{condTy}_condition_reference_TestResults"] = task[f"{condTy}_condition_reference_TestResults"]
-               R[f"{condTy}_condition_candidates_TestResults"] = task[f"{condTy}_condition_candidates_TestResults"]
-        
-    timeSpentAnalysis = time.time() - time2
+        write_evaluation_summaries(allTasks,reportfile_basename)
+    timeSpentAnalysis += time.time() - time2
 
-    # Saving raw responses and evaluation results in a json-file:
-    #write_jsonl(f"results/{experimentName}_all_{prompt_type}_{current_date}.jsonl", results)
-    write_json(f"results/{experimentName}_all_{prompt_type}_{current_date}.json", results)
+    # Saving raw responses and evaluation results in a json- or npz-file (in the jsonl-formats
+    # they are already saved):
+    if writer != None:
+        writer.close()
+    elif resultsFormat == "npz":
+        write_columnar(resultsfile, [ mk_task_record(allTasks[Tid],enableEvaluation) for Tid in allTasks ])
+    else:
+        write_json(resultsfile, [ mk_task_record(allTasks[Tid],enableEvaluation) for Tid in allTasks ])
 
     overallTime = time.time() - time0
 
@@ -129,21 +265,77 @@ def generate_results(
         "time analysis" : timeSpentAnalysis,
         "time all" : overallTime
     }
+    if pipelineInfo != None:
+        runtimeInfo["time pipeline"] = pipelineInfo["time pipeline"]
+        runtimeInfo["time AI-analysis overlap"] = pipelineInfo["time AI-analysis overlap"]
+        runtimeInfo["max queued tasks"] = pipelineInfo["max queued tasks"]
+    if enableEvaluation:
+        # kills of test-cases that ran out of time, and what they left behind:
+        runtimeInfo.update(execution_stats())
 
     runtimeInfofile = reportfile_basename.replace("evaluation","runtime") + ".txt"
     with open(runtimeInfofile,'w') as F:
-        F.write(f"time loading data:{timeSpentReadingData}\n")
-        F.write(f"time AI:{timeSpentAI}\n")
-        F.write(f"time analysis:{timeSpentAnalysis}\n")
-        F.write(f"time all:{overallTime}")
+        F.write("\n".join([ f"{key}:{value}" for (key,value) in runtimeInfo.items() ]))
 
     print( "** Time:")
-    print(f"   time loading data: {timeSpentReadingData}")
-    print(f"   time AI: {timeSpentAI}")
-    print(f"   time analysis: {timeSpentAnalysis}")
-    print(f"   time all: {overallTime}")
+    for (key,value) in runtimeInfo.items():
+        print(f"   {key}: {value}")
     # DONE
 
+def mk_task_record(task: Dict, withEvaluation: bool) -> Dict :
+    """
+    Construct the record of a task that is saved in the results file: the AI raw-responses 
+    and the extracted completions, and if withEvaluation is true also the evaluation 
+    summaries and the raw test-results.
+    """
+    R = {
+        "task_id": task["task_id"],
+        "pre_condition_prompt" : task["pre_condition_prompt"],
+        "pre_condition_raw_responses": task["pre_condition_raw_responses"],
+        "pre_condition_completions": task["pre_condition_completions"],
+        "post_condition_prompt" : task["post_condition_prompt"],
+        "post_condition_raw_responses": task["post_condition_raw_responses"],
+        "post_condition_completions": task["post_condition_completions"]
+        }
+    if withEvaluation:
+        for condTy in ["pre","post"]:
+            R[f"{condTy}_condition_ResultsSummary"] = task[f"{condTy}_condition_ResultsSummary"]
+            R[f"{condTy}_condition_reference_TestResults"] = task[f"{condTy}_condition_reference_TestResults"]
+            R[f"{condTy}_condition_candidates_TestResults"] = task[f"{condTy}_condition_candidates_TestResults"]
+            R[f"{condTy}_condition_timeouts"] = task.get(f"{condTy}_condition_timeouts")
+    return R
+
+def reduce_to_summaries(task: Dict) -> Dict :
+    """
+    Return what the summary reports need of a task whose results are already saved: its
+    id, its solutions (which tell if there is a pre-/post-condition at all), and its
+    results summaries.
+    """
+    R = { "task_id" : task["task_id"] }
+    for condTy in ["pre","post"]:
+        for field in ["solution", "ResultsSummary"]:
+            if f"{condTy}_condition_{field}" in task:
+                R[f"{condTy}_condition_{field}"] = task[f"{condTy}_condition_{field}"]
+    return R
+
+def merge_pipeline_info(info1: Dict, info2: Dict) -> Dict :
+    """
+    Combine the pipeline statistics of two batches (see generate_and_evaluate_pipelined).
+    """
+    if info1 == None: return info2
+    R = { key : info1[key] + info2[key] for key in info1 }
+    R["max queued tasks"] = max(info1["max queued tasks"], info2["max queued tasks"])
+    return R
+
+def release_task_results(task: Dict) :
+    """
+    Drop the bulky results (AI responses, raw test-results) from a task whose results are
+    already saved. The results summaries are kept.
+    """
+    for condTy in ["pre","post"]:
+        for field in ["prompt", "raw_responses", "completions", "reference_TestResults", "candidates_TestResults"]:
+            task.pop(f"{condTy}_condition_{field}", None)
+
 def fix_completionString(header:str, completion:str) -> str :
     """
     Try to fix the completion string sent by AI, e.g. by stripping of
@@ -175,67 +367,342 @@ def generate_completions(
     The creation of the prompt is coded in the module Prompting. 
     """
     def worker(condType): # pre or post
-        prompt = create_prompt(task, condition_type=condType, prompt_type=prompt_type)
-        task[condType + "_condition_prompt"] = prompt
-        task[condType + "_condition_raw_responses"] = None
-        task[condType + "_condition_completions"]   = None
+        prompt = prepare_prompt(task, condType, prompt_type)
         if prompt != None:
             # note that this gives one or more answers, in a list:
             completions = AI.completeIt(allowMultipleAnswers,prompt)
-            task[condType + "_condition_raw_responses"] = completions
-            header = task[condType + "_condition_incomplete"]
-            task[condType + "_condition_completions"] = [ fix_completionString(header,rawAnswer) for rawAnswer in completions ]
+            store_completions(task, condType, completions)
   
     worker("pre")
     worker("post")
     return task
 
+def prepare_prompt(task: Dict, condType: str, prompt_type: str) -> str :
+    """
+    Create the prompt for the pre- or post-condition (condType) of the given task, and
+    reset the task's entries that will hold the AI answers. Returns the prompt, or None
+    if the task has no such condition.
+    """
+    prompt = create_prompt(task, condition_type=condType, prompt_type=prompt_type)
+    task[condType + "_condition_prompt"] = prompt
+    task[condType + "_condition_raw_responses"] = None
+    task[condType + "_condition_completions"]   = None
+    return prompt
+
+def store_completions(task: Dict, condType: str, completions: list[str]) :
+    """
+    Add the raw answers of the AI for the pre- or post-condition (condType) of the task
+    into the task-dictionary, along with the completions extracted from them.
+    """
+    task[condType + "_condition_raw_responses"] = completions
+    header = task[condType + "_condition_incomplete"]
+    task[condType + "_condition_completions"] = [ fix_completionString(header,rawAnswer) for rawAnswer in completions ]
+
+async def generate_completions_concurrently(
+        AI: PromptResponder,
+        tasks: Dict[str,Dict],
+        allowMultipleAnswers: int,
+        prompt_type: str,
+        maxConcurrency: int,
+        journal: ExperimentJournal = None) -> Dict[str,Dict]:
+    """
+    The concurrent version of generate_completions, working on a whole set of tasks
+    at once. The prompts for all tasks, both for the pre- and post-conditions, are sent
+    to the AI through its completeItAsync method, with at most maxConcurrency prompts
+    waiting for an answer at the same time. If the AI itself specifies a lower
+    maxConcurrency, that one is used instead.
+
+    The answers are put into the task-dictionaries in the same way as generate_completions
+    does, so the end result does not depend on the order in which the answers come back.
+
+    If a journal is given, tasks whose completions are in the journal are restored from it,
+    and the completions of every other task are recorded in it once they are complete.
+    """
+    if AI.maxConcurrency != None:
+        maxConcurrency = min(maxConcurrency, AI.maxConcurrency)
+    semaphore = asyncio.Semaphore(max(1,maxConcurrency))
+
+    async def worker(task):
+        if journal != None and journal.restoreGeneration(task): return
+        await generate_task_completions_async(AI, task, allowMultipleAnswers, prompt_type, semaphore)
+        if journal != None: journal.recordGeneration(task)
+
+    await asyncio.gather(*[ worker(tasks[Tid]) for Tid in tasks ])
+    return tasks
+
+async def generate_task_completions_async(
+        AI: PromptResponder,
+        task: Dict,
+        allowMultipleAnswers: int,
+        prompt_type: str,
+        semaphore: asyncio.Semaphore) -> Dict:
+    """
+    Asynchronously generate the completions for the pre- and post-condition of a single 
+    task, both at the same time. The semaphore bounds the number of prompts that are sent
+    to the AI at the same time.
+    """
+    async def worker(condType): # pre or post
+        prompt = prepare_prompt(task, condType, prompt_type)
+        if prompt != None:
+            async with semaphore:
+                completions = await AI.completeItAsync(allowMultipleAnswers,prompt)
+            store_completions(task, condType, completions)
+
+    await asyncio.gather(worker("pre"), worker("post"))
+    return task
+
+def generate_and_evaluate_pipelined(
+        AI: PromptResponder,
+        tasks: Dict[str,Dict],
+        allowMultipleAnswers: int,
+        prompt_type: str,
+        maxConcurrency: int,
+        queueSize: int,
+        numOfEvaluationWorkers: int,
+        journal: ExperimentJournal = None,
+        onTaskEvaluated = None,
+        numOfEvaluationProcesses: int = 1) -> Dict :
+    """
+    Generate the completions of the given tasks, and evaluate them, in a pipeline. A producer
+    generates the completions task by task (or concurrently, if maxConcurrency > 1), and puts
+    every task whose completions are complete into a queue of at most queueSize tasks. 
+    A number of evaluation workers take the tasks from the queue and run the basic evaluation
+    on them (evaluate_task_result), while the producer continues with the next tasks.
+    When the queue is full the producer waits, so the number of generated, but not yet evaluated,
+    tasks stays bounded.
+
+    If a journal is given, generation and evaluation results found in the journal are restored
+    instead of being redone, and new results are recorded in it.
+
+    If onTaskEvaluated is given, it is called on every task once its evaluation is done. The
+    calls are made in the order of the tasks: a task that is evaluated before some task that
+    precedes it waits until that one is done as well. So, results written by onTaskEvaluated
+    are in the same order as in the non-pipelined mode, whatever the number of workers.
+
+    If numOfEvaluationProcesses is more than 1, the evaluation workers hand their tasks over
+    to a pool of that many processes (so, it makes sense to have as many evaluation workers).
+
+    If the generation, or the evaluation of a task, raises an exception, the pipeline stops 
+    (the remaining tasks are not generated, or not evaluated), and the first such exception
+    is raised again once all threads are done.
+
+    The results are put into the task-dictionaries, as in the non-pipelined mode. The function
+    returns a dictionary with timing information, including the time in which generation and 
+    evaluation overlapped.
+    """
+    Q = queue.Queue(maxsize=max(1,queueSize))
+    pool = EvaluationPool(numOfEvaluationProcesses) if numOfEvaluationProcesses > 1 else None
+    # the (start,end) times of the producer, and of every task-evaluation:
+    generationInterval = [None,None]
+    evaluationIntervals = []
+    maxQueued = [0]
+    producerFailure = [None]
+    # the first exception of an evaluation worker; the producer then stops generating, and
+    # the workers only drain the queue:
+    evaluationFailure = [None]
+    lock = threading.Lock()
+
+    # the tasks that are evaluated, but not yet passed to onTaskEvaluated, because a task
+    # before them is not evaluated yet:
+    order = list(tasks)
+    evaluated = set()
+    nextToReport = [0]
+    reportLock = threading.Lock()
+
+    def report(Tid):
+        with reportLock:
+            evaluated.add(Tid)
+            while nextToReport[0] < len(order) and order[nextToReport[0]] in evaluated:
+                onTaskEvaluated(tasks[order[nextToReport[0]]])
+                evaluated.discard(order[nextToReport[0]])
+                nextToReport[0] += 1
+
+    def enqueue(Tid):
+        Q.put(Tid)
+        with lock:
+            maxQueued[0] = max(maxQueued[0], Q.qsize())
+
+    def producer():
+        generationInterval[0] = time.time()
+        try:
+            if maxConcurrency > 1:
+                async def produce():
+                    limit = maxConcurrency if AI.maxConcurrency == None else min(maxConcurrency, AI.maxConcurrency)
+                    semaphore = asyncio.Semaphore(max(1,limit))
+                    async def worker(Tid):
+                        if evaluationFailure[0] != None: return
+                        if journal == None or not journal.restoreGeneration(tasks[Tid]):
+                            await generate_task_completions_async(AI, tasks[Tid], allowMultipleAnswers, prompt_type, semaphore)
+                            if journal != None: journal.recordGeneration(tasks[Tid])
+                        await asyncio.to_thread(enqueue, Tid)
+                    await asyncio.gather(*[ worker(Tid) for Tid in tasks ])
+                asyncio.run(produce())
+            else:
+                for Tid in tasks:
+                    if evaluationFailure[0] != None: break
+                    if journal == None or not journal.restoreGeneration(tasks[Tid]):
+                        generate_completions(AI, tasks[Tid], allowMultipleAnswers, prompt_type=prompt_type)
+                        if journal != None: journal.recordGeneration(tasks[Tid])
+                    enqueue(Tid)
+        except Exception as e:
+            producerFailure[0] = e
+        finally:
+            generationInterval[1] = time.time()
+            # signal the evaluation workers that there are no more tasks:
+            for k in range(numOfEvaluationWorkers): Q.put(None)
+
+    def consumer():
+        while True:
+            Tid = Q.get()
+            if Tid == None: return
+            if evaluationFailure[0] != None: continue
+            try:
+                if journal == None or not journal.restoreEvaluation(tasks[Tid]): 
+                    t0 = time.time()
+                    if pool != None:
+                        pool.evaluate(tasks[Tid])
+                    else:
+                        evaluate_task_result(tasks[Tid], "pre")
+                        evaluate_task_result(tasks[Tid], "post")
+                    if journal != None: journal.recordEvaluation(tasks[Tid])
+                    with lock:
+                        evaluationIntervals.append((t0,time.time()))
+                if onTaskEvaluated != None: report(Tid)
+            except Exception as e:
+                with lock:
+                    if evaluationFailure[0] == None: evaluationFailure[0] = e
+
+    time0 = time.time()
+    threads = [ threading.Thread(target=producer) ] + [ threading.Thread(target=consumer) for k in range(numOfEvaluationWorkers) ]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    timePipeline = time.time() - time0
+    if pool != None: pool.close()
+    if producerFailure[0] != None:
+        raise producerFailure[0]
+    if evaluationFailure[0] != None:
+        raise evaluationFailure[0]
+
+    (g0,g1) = generationInterval
+    overlap = sum([ max(0, min(e,g1) - max(s,g0)) for (s,e) in evaluationIntervals ])
+    return {
+        "time AI" : g1 - g0,
+        "time analysis" : sum([ e - s for (s,e) in evaluationIntervals ]),
+        "time AI-analysis overlap" : overlap,
+        "time pipeline" : timePipeline,
+        "max queued tasks" : maxQueued[0]
+    }
+
 class MyOpenAIClient(PromptResponder):
     """
     An instance of prompt-responder that uses openAI LLM as the backend model.
     """
-    def __init__(self, client: OpenAI, modelId:str):
+    def __init__(self, client: OpenAI, modelId:str, asyncClient: AsyncOpenAI = None):
+        """
+        The asyncClient is optional. If given, it is used when prompts are sent
+        concurrently (see generate_completions_concurrently).
+        """
         PromptResponder.__init__(self)
         self.client = client
+        self.asyncClient = asyncClient
         self.model = modelId 
-    
-    def completeIt(self, multipleAnswer:int, prompt:str) -> list[str] :
-        if self.DEBUG: print(">>> PROMPT:\n" + prompt)
 
+    def requestTemperature(self) -> float :
+        """
+        The temperature that is actually sent with the requests.
+        """
+        # some models do not allow temperature to be set!!
+        if self.model.startswith("o1") :
+            return 1
+        return self.temperature
+
+    def generationParams(self) -> Dict :
+        # the parameters as they are sent (see mkRequests); maxTokens is not sent, it
+        # is only used to reserve tokens at the rate-limiter:
+        return { 
+            "provider" : type(self).__name__,
+            "model" : self.model,
+            "temperature" : self.requestTemperature(),
+            "max_tokens" : None
+            }
+
+    def mkRequests(self, multipleAnswer:int, prompt:str) -> list[dict] :
+        """
+        Construct the arguments of the chat-completion requests needed to get
+        the given number of answers for the prompt.
+        """
         # some models limit the number of multiple-answers it could give:
         maxMultipleAnswers = multipleAnswer
         if self.model.startswith("o1") :
             maxMultipleAnswers = 8
         
-        # some models do not allow temperature to be set!!
-        xtemperature = 0.7
-        if self.model.startswith("o1") :
-            xtemperature = 1
+        xtemperature = self.requestTemperature()
         
         remainToDo = multipleAnswer
-        responses = []
+        requests = []
         while remainToDo > 0:
             numberOfAnswersToAsk = min(remainToDo,maxMultipleAnswers)
-            completion = self.client.chat.completions.create(
-                model = self.model,
-                temperature = xtemperature,
-                n = numberOfAnswersToAsk,
-                messages=[
+            requests.append({
+                "model" : self.model,
+                "temperature" : xtemperature,
+                "n" : numberOfAnswersToAsk,
+                "messages" : [
                     {
                         "role": "user",
                         "content": prompt
                     }
                     ]
-                )
-            N = min(numberOfAnswersToAsk, len(completion.choices))
-            responses = responses + [ completion.choices[k].message.content for k in range(N) ]
+                })
             remainToDo = remainToDo - numberOfAnswersToAsk
-
+        return requests
+    
+    def collectResponses(self, requests:list[dict], completions:list) -> list[str] :
+        responses = []
+        for (request,completion) in zip(requests,completions):
+            N = min(request["n"], len(completion.choices))
+            responses = responses + [ completion.choices[k].message.content for k in range(N) ]
         if self.DEBUG: 
             for k in range(len(responses)):
                 print(f">>> raw response {k}:\n {responses[k]}")
         return responses
 
+    def estimateTokens(self, request:dict) -> int :
+        """
+        Estimate the tokens a request will use, to reserve them at the rate-limiter.
+        """
+        maxOutput = self.maxTokens if self.maxTokens != None else 1024
+        return estimateTokens(request["messages"][0]["content"]) + request["n"] * maxOutput
+
+    def send(self, request:dict) :
+        if self.rateLimiter == None:
+            return self.client.chat.completions.create(**request)
+        reservation = self.rateLimiter.acquire(self.estimateTokens(request), debug=self.DEBUG)
+        completion = self.client.chat.completions.create(**request)
+        self.rateLimiter.record(reservation, completion.usage.total_tokens if completion.usage != None else None)
+        return completion
+
+    async def sendAsync(self, request:dict) :
+        if self.rateLimiter == None:
+            return await self.asyncClient.chat.completions.create(**request)
+        reservation = await self.rateLimiter.acquireAsync(self.estimateTokens(request), debug=self.DEBUG)
+        completion = await self.asyncClient.chat.completions.create(**request)
+        self.rateLimiter.record(reservation, completion.usage.total_tokens if completion.usage != None else None)
+        return completion
+
+    def completeIt(self, multipleAnswer:int, prompt:str) -> list[str] :
+        if self.DEBUG: print(">>> PROMPT:\n" + prompt)
+        requests = self.mkRequests(multipleAnswer, prompt)
+        completions = [ self.send(request) for request in requests ]
+        return self.collectResponses(requests, completions)
+
+    async def completeItAsync(self, multipleAnswer:int, prompt:str) -> list[str] :
+        if self.asyncClient == None:
+            return await PromptResponder.completeItAsync(self, multipleAnswer, prompt)
+        if self.DEBUG: print(">>> PROMPT:\n" + prompt)
+        requests = self.mkRequests(multipleAnswer, prompt)
+        completions = await asyncio.gather(*[ self.sendAsync(request) for request in requests ])
+        return self.collectResponses(requests, completions)
+
 
 
 if __name__ == '__main__':
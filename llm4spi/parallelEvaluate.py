@@ -0,0 +1,150 @@
+#
+# Running the basic evaluation (see basicEvaluate.py) of multiple tasks in parallel, using
+# a pool of worker processes. Every worker evaluates whole tasks: it loads the task's
+# reference solutions and the AI candidates, runs all the test suites, and sends back
+# the results, which are then put into the task-dictionaries as evaluate_task_result 
+# would do.
+#
+# Besides using all cores, this also isolates the evaluation from the main process: a 
+# crashing or memory-hungry candidate can only take down a worker, which is then replaced.
+#
+from typing import Dict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import threading
+
+import myconfig
+import basicEvaluate
+import sandbox
+import testSuites
+
+CONDTYPES = ["pre","post"]
+
+# the task-entries the evaluation needs, and the ones it produces:
+INPUT_FIELDS  = [ "task_id" ] + [ f"{condTy}_condition_{field}" for condTy in CONDTYPES 
+                                     for field in ["solution","tests","incomplete","completions"] ]
+RESULT_FIELDS = [ f"{condTy}_condition_{field}" for condTy in CONDTYPES 
+                                     for field in ["ResultsSummary","reference_TestResults","candidates_TestResults","timeouts"] ]
+
+# how many times a task is retried when the worker evaluating it died:
+MAX_RETRIES = 1
+
+
+def init_worker(config:Dict, debug:bool) :
+    """
+    Initialize a worker process with the configuration of the parent process, as
+    the worker does not inherit changes made to myconfig at runtime.
+    """
+    for (name,value) in config.items():
+        setattr(myconfig, name, value)
+    basicEvaluate.DEBUG = debug
+
+def evaluate_in_worker(task:Dict, suites:Dict) -> Dict :
+    """
+    Evaluate the pre- and post-condition candidates of a task. This runs in a worker.
+    The compiled test suites of the task are passed along, so that the worker does not
+    have to compile them again. Only the evaluation results are sent back, together with
+    the sandbox statistics (see sandbox.stats) of this evaluation.
+    """
+    for condType in CONDTYPES:
+        testSuites.register(task["task_id"], condType, task.get(f"{condType}_condition_tests"), suites[condType])
+    statsBefore = dict(sandbox.stats)
+    basicEvaluate.evaluate_task_result(task, "pre")
+    basicEvaluate.evaluate_task_result(task, "post")
+    stats = { stat : sandbox.stats[stat] - statsBefore[stat] for stat in statsBefore }
+    return ({ field : task[field] for field in RESULT_FIELDS }, stats)
+
+
+class EvaluationPool:
+    """
+    A pool of worker processes to run the basic evaluation of tasks. 
+    """
+    def __init__(self, numOfWorkers:int = None):
+        if numOfWorkers == None:
+            numOfWorkers = os.cpu_count()
+        self.numOfWorkers = numOfWorkers
+        self.lock = threading.Lock()
+        self.executor = self.mkExecutor()
+
+    def mkExecutor(self) -> ProcessPoolExecutor :
+        config = { name : getattr(myconfig,name) for name in dir(myconfig) if name.isupper() }
+        return ProcessPoolExecutor(max_workers=self.numOfWorkers,
+                                mp_context=multiprocessing.get_context("spawn"),
+                                max_tasks_per_child=myconfig.EVALUATION_WORKER_MAX_TASKS,
+                                initializer=init_worker,
+                                initargs=(config, basicEvaluate.DEBUG))
+
+    def submit(self, task:Dict) :
+        taskInput = { field : task[field] for field in INPUT_FIELDS if field in task }
+        suites = { condType : testSuites.get_test_suites(task, condType) for condType in CONDTYPES }
+        with self.lock:
+            try:
+                return self.executor.submit(evaluate_in_worker, taskInput, suites)
+            except BrokenProcessPool:
+                # a worker died, which breaks the whole pool; we replace it:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self.mkExecutor()
+                return self.executor.submit(evaluate_in_worker, taskInput, suites)
+
+    def collect(self, task:Dict, future, retries:int = MAX_RETRIES) :
+        """
+        Wait for the result of the given future, which evaluates the task, and put the 
+        results into the task-dictionary. The worker's sandbox statistics are added to
+        those of this process. If the worker died, the task is evaluated again, 
+        unless it has run out of retries; its results are then left empty (None), as 
+        when the reference solution crashes.
+        """
+        try:
+            (results, stats) = future.result()
+            for stat in stats: sandbox.count(stat, stats[stat])
+        except BrokenProcessPool:
+            if retries > 0:
+                print(f">>>>>> A worker died while evaluating task {task['task_id']}; retrying.")
+                return self.collect(task, self.submit(task), retries-1)
+            print(f">>>>>> A worker died while evaluating task {task['task_id']}!")
+            results = { field : None for field in RESULT_FIELDS }
+        task.update(results)
+
+    def evaluate(self, task:Dict) :
+        """
+        Evaluate a single task in the pool, and wait for its results. This can be
+        called from multiple threads.
+        """
+        self.collect(task, self.submit(task))
+
+    def close(self) :
+        self.executor.shutdown()
+
+
+def evaluate_tasks_results_parallel(tasks: Dict[str,Dict], 
+                                    reportfile_basename:str, 
+                                    numOfWorkers:int = None, 
+                                    journal=None, 
+                                    onTaskEvaluated=None,
+                                    withSummaries:bool=True) :
+    """
+    The parallel version of basicEvaluate.evaluate_tasks_results. The tasks are evaluated by
+    a pool of numOfWorkers processes (by default, one per core). The results are put into
+    the task-dictionaries, and the summaries are written, in the same way as
+    evaluate_tasks_results does.
+    """
+    pool = EvaluationPool(numOfWorkers)
+    try:
+        futures = {}
+        for tID in tasks:
+            T = tasks[tID]
+            if journal == None or not journal.restoreEvaluation(T):
+                futures[tID] = pool.submit(T)
+        # collecting the results in the order of the tasks, to keep the output deterministic:
+        for tID in tasks:
+            T = tasks[tID]
+            if tID in futures:
+                pool.collect(T, futures[tID])
+                if journal != None: journal.recordEvaluation(T)
+            if onTaskEvaluated != None: onTaskEvaluated(T)
+    finally:
+        pool.close()
+    if withSummaries:
+        basicEvaluate.write_evaluation_summaries(tasks,reportfile_basename)
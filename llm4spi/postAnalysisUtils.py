@@ -1,5 +1,5 @@
 import json
-from data import read_problems
+from data import read_problems, read_results
 import os.path
 
 
@@ -16,12 +16,14 @@ def exportOutLLMProposals(datasetFile:str, outputjson:str, dirToPutGeneratedPy:s
     All proposals from LLM will be exported as Python functions, put in a single
     Python-file, with the same base-name as outputjson, But it will be placed in the
     dir specified by dirToPutGeneratedPy.
+
+    The output can also be a jsonl-file (possibly gzipped); it is then read one task at a time.
     """
     problems = read_problems(datasetFile)
     outputBaseName = os.path.basename(outputjson)
-    outputBaseName = os.path.splitext(outputBaseName)[0]
-    with open(outputjson, "r") as fp:
-        results = json.load(fp)
+    for ext in [".gz", ".jsonl", ".json"]:
+        if outputBaseName.endswith(ext): outputBaseName = outputBaseName[: -len(ext)]
+    results = read_results(outputjson)
 
     pyfname = "proposals_" + outputBaseName + ".py"
     pyfname = os.path.join(dirToPutGeneratedPy, pyfname)
@@ -83,8 +85,7 @@ def executeLLMProposal(datasetFile:str, outputjson:str, Tid:str, condTy:str, pro
     funcName = f"check_{condTy}_{Tid}_{proposalIndex}"  
     funcHeader = "def " + funcName + params
 
-    with open(outputjson, "r") as fp:
-        results = json.load(fp)
+    results = read_results(outputjson)
     
     for R in results:
         if R["task_id"] == Tid:
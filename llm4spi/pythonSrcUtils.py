@@ -1,6 +1,8 @@
 #
 # Contain functions for pre-processing strings containing Python code.
 #  
+import ast
+import hashlib
 
 
 def extractFunctionBody(pythonStr:str) -> str :
@@ -129,9 +131,11 @@ def fix_indentation(functionDefLine:str, body:str) -> str :
     if functionDefLine.startswith('def ') :
         functionDefLine = functionDefLine[4 : ]
     
+    # the defs are executed in a throw-away namespace, so the probes do not pile up
+    # in the globals of this module:
     fun0 = 'def xxx_' + functionDefLine + '\n' + body
     try:
-        exec(fun0,globals())
+        exec(fun0,{})
         # the function can be executed
         print(">>> AI proposed function looks good.")
         return body
@@ -143,7 +147,7 @@ def fix_indentation(functionDefLine:str, body:str) -> str :
             return None
         try :
             fun1 = 'def yyy_' + functionDefLine + '\n' + body2
-            exec(fun1,globals())
+            exec(fun1,{})
             print("    Indentation fixed.")
             return body2
         except :
@@ -151,6 +155,26 @@ def fix_indentation(functionDefLine:str, body:str) -> str :
             return None
 
 
+def astFingerprint(pythonStr:str) -> str :
+    """
+    Return a fingerprint of the given Python code, such that pieces of code that only
+    differ in their layout, comments, or docstrings get the same fingerprint. This is
+    a hash of the code's AST (with the docstrings removed).
+    None is returned if the code cannot be parsed.
+    """
+    try:
+        tree = ast.parse(pythonStr)
+    except (SyntaxError, ValueError):
+        return None
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Module)):
+            body = node.body
+            if len(body) > 0 and isinstance(body[0], ast.Expr) \
+                    and isinstance(body[0].value, ast.Constant) and isinstance(body[0].value.value, str):
+                # a docstring; if it is the whole body we replace it with a pass, to keep the body valid:
+                node.body = body[1:] if len(body) > 1 else [ ast.Pass() ]
+    return hashlib.sha256(ast.dump(tree).encode("utf-8")).hexdigest()
+
 def fix_indentation_worker(pythonStr:str) -> str :
     def current(scopes:list):
         N = len(scopes)
@@ -308,6 +332,52 @@ def fix_indentation_worker(pythonStr:str) -> str :
   
 
 
+# the entry in the namespace of a loaded function that lists the defs (and the names of
+# the functions they define) that were executed to make the namespace; see load_function:
+DEFINITIONS = "__llm4spi_definitions__"
+
+def load_function(src:str, fname:str, baseNamespace:dict=None):
+    """
+    Execute the given def of a function, and return the function it defines, with
+    the given name. The def is executed in a namespace of its own, which starts as a
+    copy of the base-namespace (if given). So, the functions loaded this way do not
+    pile up in the globals of some module; a function and whatever it defined are gone
+    as soon as the function is not used anymore.
+    The exceptions of executing the def (e.g. a syntax error) are passed on.
+
+    The namespace records the defs that made it, so that the function can be loaded
+    again elsewhere, e.g. in another process (see function_definitions).
+    """
+    if baseNamespace == None:
+        namespace = { "__builtins__" : __builtins__ }
+    else:
+        namespace = dict(baseNamespace)
+    namespace[DEFINITIONS] = namespace.get(DEFINITIONS, ()) + ((src,fname),)
+    exec(src,namespace)
+    return namespace[fname]
+
+def function_definitions(fn) -> tuple :
+    """
+    The defs, as pairs (src,fname), from which the given function was loaded with
+    load_function; loading them one after another, each in the namespace of the
+    previous one, gives the function again. None if fn was not loaded that way.
+    """
+    definitions = getattr(fn, "__globals__", {}).get(DEFINITIONS)
+    if definitions == None or fn.__globals__.get(definitions[-1][1]) is not fn:
+        return None
+    return definitions
+
+def reload_function(definitions:tuple):
+    """
+    Load a function again from its definitions (see function_definitions).
+    """
+    namespace = None
+    for (src,fname) in definitions:
+        fn = load_function(src, fname, namespace)
+        namespace = fn.__globals__
+    return fn
+
+
 if __name__ == '__main__':
     # some tests
     txt = """#some comment
@@ -0,0 +1,148 @@
+#
+# Rate limiting of the requests sent to LLM providers. Providers typically limit the
+# number of requests per minute (RPM), the number of tokens per minute (TPM), and the
+# number of requests per day (RPD). The limiter below keeps track of these with sliding
+# windows, and lets a caller wait until a new request fits within all limits.
+#
+# The limiter can be used from multiple threads, and from asyncio code. Limiters are
+# registered by name (see getRateLimiter), so that all clients talking to the same
+# provider/model share the same limits.
+#
+import asyncio
+import threading
+import time
+from collections import deque
+
+MINUTE = 60
+DAY = 24 * 60 * 60
+
+
+def estimateTokens(text:str) -> int :
+    """
+    A rough estimation of the number of tokens in the given text (about 4 characters
+    per token), for when the provider cannot tell us the actual number.
+    """
+    if text == None: return 0
+    return len(text) // 4 + 1
+
+
+class Reservation:
+    """
+    Represents a request that has been admitted by a rate-limiter, along with the number
+    of tokens reserved for it. Once the actual token usage of the request is known, it should
+    be reported through RateLimiter.record.
+    """
+    def __init__(self, timestamp:float, tokens:int):
+        self.timestamp = timestamp
+        self.tokens = tokens
+
+
+class RateLimiter:
+    """
+    A sliding-window rate limiter for requests-per-minute (rpm), tokens-per-minute (tpm), 
+    and requests-per-day (rpd). A limit that is None is not enforced.
+    """
+    def __init__(self, rpm:int = None, tpm:int = None, rpd:int = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rpd = rpd
+        self.lock = threading.Lock()
+        # the reservations made in the last minute, and the timestamps of the requests
+        # in the last day:
+        self.minuteWindow = deque()
+        self.dayWindow = deque()
+        self.tokensInMinuteWindow = 0
+        self.totalRequests = 0
+        self.totalTokens = 0
+        self.totalWaitTime = 0
+
+    def purge(self, now:float) :
+        while len(self.minuteWindow) > 0 and now - self.minuteWindow[0].timestamp >= MINUTE :
+            R = self.minuteWindow.popleft()
+            self.tokensInMinuteWindow -= R.tokens
+        while len(self.dayWindow) > 0 and now - self.dayWindow[0] >= DAY :
+            self.dayWindow.popleft()
+
+    def tryReserve(self, estimatedTokens:int) -> tuple :
+        """
+        Try to admit a new request that is estimated to use the given number of tokens.
+        Returns a pair (R,wait). If the request is admitted, R is its reservation and wait is 0.
+        Else R is None, and wait is the time (in seconds) after which it makes sense to try again.
+        """
+        with self.lock:
+            now = time.time()
+            self.purge(now)
+            waits = [0]
+            if self.rpm != None and len(self.minuteWindow) >= self.rpm :
+                waits.append(self.minuteWindow[0].timestamp + MINUTE - now)
+            if self.tpm != None and len(self.minuteWindow) > 0 and self.tokensInMinuteWindow + estimatedTokens > self.tpm :
+                # wait until enough old reservations leave the window; a request that on
+                # its own exceeds tpm is admitted once the window is empty
+                freed = 0
+                for R in self.minuteWindow:
+                    freed += R.tokens
+                    if self.tokensInMinuteWindow - freed + estimatedTokens <= self.tpm : break
+                waits.append(R.timestamp + MINUTE - now)
+            if self.rpd != None and len(self.dayWindow) >= self.rpd :
+                waits.append(self.dayWindow[0] + DAY - now)
+            wait = max(waits)
+            if wait > 0:
+                return (None,wait)
+            R = Reservation(now, estimatedTokens)
+            self.minuteWindow.append(R)
+            self.dayWindow.append(now)
+            self.tokensInMinuteWindow += estimatedTokens
+            self.totalRequests += 1
+            self.totalTokens += estimatedTokens
+            return (R,0)
+
+    def acquire(self, estimatedTokens:int = 0, debug:bool = False) -> Reservation :
+        """
+        Wait (blocking the current thread) until a request with the given estimated number
+        of tokens can be sent, and reserve it.
+        """
+        while True:
+            (R,wait) = self.tryReserve(estimatedTokens)
+            if R != None: return R
+            if debug: print(f">>> rate limit reached, SLEEPING {wait}s ...")
+            self.totalWaitTime += wait
+            time.sleep(wait)
+
+    async def acquireAsync(self, estimatedTokens:int = 0, debug:bool = False) -> Reservation :
+        """
+        As acquire, but waits asynchronously.
+        """
+        while True:
+            (R,wait) = self.tryReserve(estimatedTokens)
+            if R != None: return R
+            if debug: print(f">>> rate limit reached, SLEEPING {wait}s ...")
+            self.totalWaitTime += wait
+            await asyncio.sleep(wait)
+
+    def record(self, reservation:Reservation, actualTokens:int) :
+        """
+        Report the actual number of tokens used by the request of the given reservation.
+        If the actual number is unknown (None), the estimation is kept.
+        """
+        if actualTokens == None: return
+        with self.lock:
+            delta = actualTokens - reservation.tokens
+            reservation.tokens = actualTokens
+            self.totalTokens += delta
+            if reservation in self.minuteWindow:
+                self.tokensInMinuteWindow += delta
+
+
+# The limiters, registered by name:
+rateLimiters = {}
+rateLimitersLock = threading.Lock()
+
+def getRateLimiter(name:str, rpm:int = None, tpm:int = None, rpd:int = None) -> RateLimiter :
+    """
+    Return the rate-limiter registered with the given name, e.g. "groq/llama3-70b-8192".
+    If there is none yet, one is created with the given limits. 
+    """
+    with rateLimitersLock:
+        if not (name in rateLimiters):
+            rateLimiters[name] = RateLimiter(rpm=rpm, tpm=tpm, rpd=rpd)
+        return rateLimiters[name]
@@ -0,0 +1,70 @@
+#
+# A persistent cache of the results of running the test suites on the reference solutions
+# of the tasks. These results only depend on the dataset, so they can be reused across
+# experiments (different models, different prompt types).
+#
+# An entry is identified by the hash of the solution's source code and of the string that
+# specifies the test-cases. So, changing a task's solution or tests only invalidates
+# the entry of that task. Next to the results, an entry keeps the time the slowest test-case
+# of each suite took, from which the time-outs for the candidates can be derived.
+#
+import hashlib
+import json
+import os
+
+import myconfig
+from diskCache import PersistentCache
+
+# the version of the format of the entries; entries of another version are dropped:
+SCHEMA_VERSION = 2
+
+# the cache is opened on first use (in every process that uses it):
+cache = None
+
+def getCache() -> PersistentCache :
+    """
+    Return the cache, or None if the cache is disabled (see myconfig.py).
+    """
+    global cache
+    if myconfig.REFERENCE_RESULTS_CACHE_FILE == None: 
+        return None
+    if cache == None or cache.dbfile != myconfig.REFERENCE_RESULTS_CACHE_FILE:
+        cacheDir = os.path.dirname(myconfig.REFERENCE_RESULTS_CACHE_FILE)
+        if cacheDir != "": 
+            os.makedirs(cacheDir, exist_ok=True)
+        cache = PersistentCache(myconfig.REFERENCE_RESULTS_CACHE_FILE, myconfig.REFERENCE_RESULTS_CACHE_MAX_BYTES, SCHEMA_VERSION)
+    return cache
+
+def mkKey(solutionSrc:str, testsSrc:str) -> str :
+    h = hashlib.sha256()
+    for s in [solutionSrc, testsSrc]:
+        data = s.encode("utf-8")
+        # prefix every part with its length, so that different splits give different keys
+        h.update(len(data).to_bytes(8,"little"))
+        h.update(data)
+    return h.hexdigest()
+
+def lookup(solutionSrc:str, testsSrc:str) -> tuple :
+    """
+    Return the cached reference results for the given solution and tests, and the
+    runtimes of the slowest test-case per suite, or None if they are not in the cache.
+    """
+    C = getCache()
+    if C == None: return None
+    value = C.get(mkKey(solutionSrc, testsSrc))
+    if value == None: return None
+    entry = json.loads(value)
+    return (entry["results"], entry["runtimes"])
+
+def store(solutionSrc:str, testsSrc:str, results:dict, runtimes:dict) :
+    """
+    Put the reference results for the given solution and tests in the cache, along with
+    the runtimes of the slowest test-case per suite. Results are only cached if they consist
+    of booleans (and Nones), which survive the round trip through json unchanged.
+    """
+    C = getCache()
+    if C == None: return
+    for suiteResults in results.values():
+        if any(r != None and type(r) != bool for r in suiteResults): 
+            return
+    C.put(mkKey(solutionSrc, testsSrc), json.dumps({ "results" : results, "runtimes" : runtimes }).encode("utf-8"))
@@ -0,0 +1,91 @@
+#
+# A persistent cache of LLM responses. Re-running an experiment (e.g. after a crash, or
+# after changing only the evaluation) would otherwise send all the prompts to the LLM again.
+#
+# The cache is content-addressed: an answer is identified by the provider, the model, 
+# the hash of the prompt, the sampling parameters (temperature and max_tokens) as they are
+# sent to the model (see PromptResponder.generationParams), and the index of the answer
+# (when multiple answers are asked for the same prompt).
+#
+import hashlib
+import json
+
+import myconfig
+from diskCache import PersistentCache
+from openai4spi import PromptResponder
+
+
+def mkResponseKey(generationParams:dict, prompt:str, sampleIndex:int) -> str :
+    """
+    Construct the cache-key of the sampleIndex-th answer to the given prompt.
+    """
+    promptHash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    K = [ generationParams.get("provider"),
+          generationParams.get("model"),
+          promptHash,
+          generationParams.get("temperature"),
+          generationParams.get("max_tokens"),
+          sampleIndex ]
+    return hashlib.sha256(json.dumps(K).encode("utf-8")).hexdigest()
+
+
+class CachingResponder(PromptResponder):
+    """
+    A prompt-responder that wraps around another responder, and caches its answers
+    in a persistent cache. Only the answers that are not in the cache yet are asked 
+    to the wrapped responder.
+    """
+    def __init__(self, responder:PromptResponder, cachefile:str, maxBytes:int = myconfig.RESPONSE_CACHE_MAX_BYTES):
+        PromptResponder.__init__(self)
+        self.responder = responder
+        self.DEBUG = responder.DEBUG
+        self.cache = PersistentCache(cachefile, maxBytes)
+        self.maxConcurrency = responder.maxConcurrency
+        self.model = responder.model
+        self.temperature = responder.temperature
+        self.maxTokens = responder.maxTokens
+
+    def generationParams(self) -> dict :
+        return self.responder.generationParams()
+
+    def lookup(self, multipleAnswer:int, prompt:str) -> tuple :
+        """
+        Return the keys of the requested answers, and the answers as found in the cache
+        (None for the answers that are not in the cache).
+        """
+        params = self.generationParams()
+        keys = [ mkResponseKey(params,prompt,k) for k in range(multipleAnswer) ]
+        answers = []
+        for key in keys:
+            value = self.cache.get(key)
+            answers.append(None if value == None else json.loads(value))
+        return (keys,answers)
+
+    def merge(self, keys:list, answers:list, freshAnswers:list) -> list :
+        """
+        Fill the missing answers with the fresh answers from the wrapped responder, and
+        store those in the cache. The answers keep their positions, as in the answers of
+        the wrapped responder: a missing or None answer stays None (and is not cached).
+        """
+        fresh = iter(freshAnswers)
+        for k in range(len(keys)):
+            if answers[k] != None: continue
+            A = next(fresh, None)
+            answers[k] = A
+            if A != None:
+                self.cache.put(keys[k], json.dumps(A).encode("utf-8"))
+        if self.DEBUG:
+            print(f">>> response cache: {self.cache.hits} hits, {self.cache.misses} misses")
+        return answers
+
+    def completeIt(self, multipleAnswer:int, prompt:str) -> list[str] :
+        (keys,answers) = self.lookup(multipleAnswer, prompt)
+        missing = len([ 1 for A in answers if A == None ])
+        freshAnswers = self.responder.completeIt(missing, prompt) if missing > 0 else []
+        return self.merge(keys, answers, freshAnswers)
+
+    async def completeItAsync(self, multipleAnswer:int, prompt:str) -> list[str] :
+        (keys,answers) = self.lookup(multipleAnswer, prompt)
+        missing = len([ 1 for A in answers if A == None ])
+        freshAnswers = await self.responder.completeItAsync(missing, prompt) if missing > 0 else []
+        return self.merge(keys, answers, freshAnswers)
@@ -0,0 +1,246 @@
+#
+# Running test-cases on AI candidates in a separate worker process, which is killed (SIGKILL)
+# when a test-case exceeds its time-out. Unlike a thread (see func_timeout), a process can 
+# always be stopped, also when the candidate is stuck inside C code, e.g. in sum(range(10**12))
+# or in a catastrophic regular expression.
+#
+# A worker is reused for as long as it lives, so a new process is only started after a kill
+# (or a crash). The candidate function is shipped to the worker as the defs it was loaded
+# from (see pythonSrcUtils.load_function), i.e. the reference solution's def and its own, so
+# that it runs in the same namespace as in the other execution modes. A function that was not
+# loaded that way is shipped as its (marshalled) code.
+#
+# The worker also limits the memory, CPU time, and open files a candidate can use (see 
+# myconfig.py), so that a single candidate cannot e.g. push the machine into swapping. A 
+# test-case that hits one of these limits gives a failure that says which limit it was.
+#
+import errno
+import marshal
+import math
+import multiprocessing
+import pickle
+import signal
+import threading
+import types
+try:
+    import resource
+except ImportError:
+    # not on Windows; the resource limits are then not imposed
+    resource = None
+
+import myconfig
+from pythonSrcUtils import function_definitions, reload_function
+
+# the results of test-cases that hit a resource limit:
+FAILED_MEMORY = "failed: memory limit"
+FAILED_CPU    = "failed: cpu limit"
+FAILED_FILES  = "failed: open files limit"
+
+# the time (in seconds) a new worker may take to start:
+STARTUP_TIMEOUT = 60
+
+# the statistics of the sandboxes, over all threads of this process:
+statsLock = threading.Lock()
+stats = { "sandbox kills" : 0, "sandbox respawns" : 0, "sandbox leaked processes" : 0 }
+
+def count(stat:str, n:int = 1) :
+    with statsLock:
+        stats[stat] += n
+
+class CpuLimitHit(BaseException):
+    """
+    Raised (on SIGXCPU) in a worker whose candidate used up its CPU time. It is not an 
+    Exception, so that it is not swallowed by the usual except-clauses in AI code.
+    """
+    pass
+
+def onCpuLimit(signum, frame):
+    raise CpuLimitHit()
+
+def address_space_size() -> int :
+    """
+    The current size (in bytes) of the address space of this process.
+    """
+    try:
+        with open("/proc/self/statm") as fp:
+            return int(fp.read().split()[0]) * resource.getpagesize()
+    except OSError:
+        # not Linux; then the maximum resident size has to do
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def set_soft_limit(limitType, limit:int):
+    (soft, hard) = resource.getrlimit(limitType)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(limitType, (limit, hard))
+
+def apply_limits(limits:dict):
+    """
+    Limit the memory and open files of the worker; the memory on top of what the worker 
+    itself already uses.
+    """
+    if resource == None: return
+    if limits["memory"] != None:
+        set_soft_limit(resource.RLIMIT_AS, address_space_size() + limits["memory"])
+    if limits["files"] != None:
+        set_soft_limit(resource.RLIMIT_NOFILE, limits["files"])
+    if limits["cpu"] != None:
+        signal.signal(signal.SIGXCPU, onCpuLimit)
+
+def limit_cpu(limits:dict):
+    """
+    Limit the CPU time of the next test-case. The limit is on the worker's total CPU time,
+    so it is set relative to what is already used.
+    """
+    if resource == None or limits["cpu"] == None: return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    set_soft_limit(resource.RLIMIT_CPU, math.ceil(usage.ru_utime + usage.ru_stime + limits["cpu"]))
+
+def worker_main(conn, limits:dict) :
+    """
+    The loop of the worker process. It receives the messages ("define", fnBytes) and 
+    ("run", test_case), and answers every run with the result of the test-case.
+    """
+    fn = None
+    apply_limits(limits)
+    conn.send("ready")
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message[0] == "define":
+            try:
+                fn = deserialize(message[1])
+            except Exception:
+                # every test-case then fails, as the def of the function crashed
+                fn = None
+            continue
+        try:
+            if fn == None:
+                raise RuntimeError("the function could not be defined")
+            limit_cpu(limits)
+            result = fn(*message[1])
+            # as basicEvaluate.sanitize_result; e.g. a lambda cannot be sent back anyway:
+            if result != None and type(result) != bool:
+                result = "not a boolean value"
+        except CpuLimitHit:
+            result = FAILED_CPU
+        except MemoryError:
+            result = FAILED_MEMORY
+        except OSError as e:
+            result = FAILED_FILES if e.errno == errno.EMFILE else "failed"
+        except Exception:
+            result = "failed"
+        conn.send(result)
+
+def serialize(fn) -> bytes :
+    definitions = function_definitions(fn)
+    if definitions != None:
+        return pickle.dumps(("definitions", definitions))
+    return pickle.dumps(("code", fn.__name__, marshal.dumps(fn.__code__), fn.__defaults__))
+
+def deserialize(fnBytes:bytes) :
+    message = pickle.loads(fnBytes)
+    if message[0] == "definitions":
+        return reload_function(message[1])
+    (_, name, code, defaults) = message
+    namespace = { "__builtins__" : __builtins__ }
+    fn = types.FunctionType(marshal.loads(code), namespace, name, defaults)
+    # so that a recursive candidate can find itself:
+    namespace[name] = fn
+    return fn
+
+
+class Sandbox:
+    """
+    A worker process to run test-cases in, and the pipe to talk to it. The process is 
+    started on first use, and again after it was killed.
+    """
+    def __init__(self):
+        self.process = None
+        self.conn = None
+        self.definedFn = None
+        self.started = False
+
+    def start(self):
+        if self.started:
+            count("sandbox respawns")
+        self.started = True
+        context = multiprocessing.get_context("spawn")
+        (self.conn, childConn) = context.Pipe()
+        limits = { "memory" : myconfig.CANDIDATE_MEMORY_LIMIT, 
+                   "cpu"    : myconfig.CANDIDATE_CPU_LIMIT,
+                   "files"  : myconfig.CANDIDATE_MAX_OPEN_FILES }
+        self.process = context.Process(target=worker_main, args=(childConn,limits), daemon=True)
+        self.process.start()
+        childConn.close()
+        self.definedFn = None
+        # wait until the worker is up, so that its start-up does not count for the time-out
+        # of the first test-case:
+        if not self.conn.poll(STARTUP_TIMEOUT) or self.conn.recv() != "ready":
+            raise OSError("The sandbox worker did not start.")
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(5)
+        if self.process.is_alive():
+            count("sandbox leaked processes")
+        self.conn.close()
+        self.process = None
+
+    def define(self, fnBytes:bytes):
+        if self.process == None:
+            self.start()
+        if self.definedFn != fnBytes:
+            self.conn.send(("define", fnBytes))
+            self.definedFn = fnBytes
+
+    def run(self, fnBytes:bytes, test_case, timeout:float) :
+        """
+        Run a single test-case on the function (serialized by serialize), and return the 
+        result, or "failed" when it crashed or did not finish within the time-out.
+        """
+        try:
+            self.define(fnBytes)
+            self.conn.send(("run", test_case))
+            if self.conn.poll(timeout):
+                result = self.conn.recv()
+                if result == FAILED_MEMORY:
+                    # the worker's memory may be in a bad shape now; we start a new one
+                    self.kill()
+                return result
+        except (EOFError, OSError, pickle.PicklingError):
+            # the worker died (e.g. the candidate called os._exit), or the test-case could
+            # not be sent to it
+            self.kill()
+            return "failed"
+        print(">>> An AI solution execution on a test-case is killed due to timed out.")
+        count("sandbox kills")
+        self.kill()
+        return "failed"
+
+# every thread gets its own sandbox:
+local = threading.local()
+
+def getSandbox() -> Sandbox :
+    if getattr(local, "sandbox", None) == None:
+        local.sandbox = Sandbox()
+    return local.sandbox
+
+def run_test_suite_in_sandbox(fn, suite:list, tracker, timeout:float, budget) -> list :
+    """
+    Run the test-cases of the suite on fn in the sandbox of the current thread. The tracker
+    and the budget are as in basicEvaluate.run_test_suite.
+    """
+    fnBytes = serialize(fn)
+    sandbox = getSandbox()
+    results = []
+    for test_case in suite:
+        t = budget.limit(timeout)
+        results.append(sandbox.run(fnBytes, test_case, t) if t > 0 else "failed")
+        if tracker != None and tracker.add(results[-1]):
+            break
+    if len(results) < len(suite):
+        results.extend(tracker.skip(len(suite) - len(results)))
+    return results
@@ -3,8 +3,59 @@
 # programs. This is expressed in terms of the Lehvensein distance
 # between the two strings of the programs' code.
 #
+# The distance is calculated with the bit-parallel algorithm of Myers (as formulated by
+# Hyyrö for the Levenshtein distance), using Python's ints as bit-vectors. This takes
+# a number of steps linear in the length of one program, each a few operations on
+# ints as long (in bits) as the other program.
+#
+# To measure how diverse a set of programs is (e.g. the candidates proposed for a task)
+# the distances between all pairs of them are needed. For this, the programs are packed
+# in a single bit-vector, so that the distances of one program to all others are
+# calculated in one pass over that program.
+#
+
+import functools
+import re
+import numpy as np
 
-import edit_distance
+# the number of distances to remember; the same pair of programs is compared again e.g.
+# when the same candidate comes back in another experiment:
+CACHE_SIZE = 4096
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def bitParallelDistance(s1:str, s2:str) -> int :
+    """
+    Return the Levenshtein distance between the two strings.
+    """
+    # the shorter string is the pattern, whose positions are the bits:
+    if len(s1) < len(s2):
+        (s1,s2) = (s2,s1)
+    m = len(s2)
+    if m == 0: return len(s1)
+    # for every character, the bit-vector of its positions in the pattern:
+    peq = {}
+    for (i,c) in enumerate(s2):
+        peq[c] = peq.get(c,0) | (1 << i)
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    # the vertical deltas (+1 and -1) of the current column of the DP-matrix:
+    pv = mask
+    mv = 0
+    distance = m
+    for c in s1:
+        eq = peq.get(c,0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        # the horizontal deltas:
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+        if ph & last: distance += 1
+        if mh & last: distance -= 1
+        ph = (ph << 1) | 1
+        mh = mh << 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return distance
 
 def levenshteinDistance(progRef:str, prog2:str):
     """
@@ -19,13 +70,11 @@ def levenshteinDistance(progRef:str, prog2:str):
 
     Todo: ignore comments too.
     """
-    # we remove the header-line, and leading and trailing spaces of every line
-    p1 = '\n'.join([ line.strip() for line in progRef.splitlines()[1:] ])
-    p2 = '\n'.join([ line.strip() for line in prog2.splitlines()[1:] ])
+    p1 = normalizedCode(progRef)
+    p2 = normalizedCode(prog2)
     N2 = len(p2)
     if N2==0: return None
-    sm = edit_distance.SequenceMatcher(a=p1, b=p2)
-    levenstein = sm.distance()
+    levenstein = bitParallelDistance(p1,p2)
     R = {
         'distance':levenstein,
         'relativeDistance' : levenstein/(0.0 + N2),
@@ -34,8 +83,104 @@ def levenshteinDistance(progRef:str, prog2:str):
         }
     return R
     
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def normalizedCode(prog:str) -> str :
+    """
+    Return the code of the program that is compared: without the header-line, and
+    without the leading and trailing spaces of every line.
+    """
+    return '\n'.join([ line.strip() for line in prog.splitlines()[1:] ])
+
+# the tokens are names/numbers and single other characters:
+TOKEN = re.compile(r"\w+|\S")
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def codeTokens(prog:str) -> tuple :
+    """
+    Return the normalized code of the program (see normalizedCode) as a tuple of tokens.
+    """
+    return tuple(TOKEN.findall(normalizedCode(prog)))
+
+def distancesToAll(text, patterns:list) -> list :
+    """
+    Return the Levenshtein distances between the text and each of the patterns. The texts
+    and patterns can be strings, or tuples (e.g. of tokens).
+
+    All patterns are packed in one bit-vector, each in a segment of its own, which is
+    followed by a guard bit that stops the carries of the addition from flowing into the
+    next segment. The distance of a pattern is read from its segment at the end: it is
+    the length of the text plus the vertical deltas of the last column.
+    """
+    peq = {}
+    realBits = 0
+    lowBits = 0
+    bounds = []
+    offset = 0
+    for p in patterns:
+        for (i,c) in enumerate(p):
+            peq[c] = peq.get(c,0) | (1 << (offset + i))
+        realBits |= ((1 << len(p)) - 1) << offset
+        lowBits |= 1 << offset
+        bounds.append((offset, offset + len(p)))
+        offset += len(p) + 1
+    pv = realBits
+    mv = 0
+    for c in text:
+        eq = peq.get(c,0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & realBits
+        mh = pv & xh
+        ph = (ph << 1) | lowBits
+        mh = (mh << 1) & realBits
+        pv = (mh | ~(xv | ph)) & realBits
+        mv = ph & xv & realBits
+    # counting the bits of pv and mv per segment:
+    def bitsCumulative(vector):
+        bits = np.unpackbits(np.frombuffer(vector.to_bytes(offset//8 + 1, "little"), dtype=np.uint8), bitorder="little")
+        return np.concatenate(([0], np.cumsum(bits, dtype=np.int64)))
+    P = bitsCumulative(pv)
+    M = bitsCumulative(mv)
+    starts = np.array([ b[0] for b in bounds ], dtype=np.int64)
+    ends   = np.array([ b[1] for b in bounds ], dtype=np.int64)
+    return (len(text) + (P[ends] - P[starts]) - (M[ends] - M[starts])).tolist()
+
+def diversityMatrix(progs:list, tokens:bool=False) -> np.ndarray :
+    """
+    Return the NxN matrix of the distances between the given N programs, normalized
+    to [0..1] by dividing the Levenshtein distance of two programs by the length of
+    the longer one. The programs are normalized as in levenshteinDistance. The
+    distance is between their characters, or between their tokens if tokens is True.
+
+    Programs that are the same after normalization are only compared once.
+    """
+    normalize = codeTokens if tokens else normalizedCode
+    codes = [ normalize(p) for p in progs ]
+    uniques = list(dict.fromkeys(codes))
+    index = { c:k for (k,c) in enumerate(uniques) }
+    U = np.zeros((len(uniques),len(uniques)))
+    lengths = np.array([ len(c) for c in uniques ], dtype=float)
+    for (k,c) in enumerate(uniques):
+        # the lower half is filled in by the transpose below:
+        if k+1 == len(uniques): break
+        U[k,k+1:] = distancesToAll(c, uniques[k+1:])
+    U = U + U.T
+    longest = np.maximum.outer(lengths, lengths)
+    U = np.divide(U, longest, out=np.zeros_like(U), where=longest > 0)
+    rows = np.array([ index[c] for c in codes ], dtype=np.int64)
+    return U[np.ix_(rows,rows)]
+
+def diversity(progs:list, tokens:bool=False) -> float :
+    """
+    Return the average normalized distance (see diversityMatrix) between two different
+    programs from the given list; or None if there are less than two programs.
+    """
+    N = len(progs)
+    if N < 2: return None
+    return float(diversityMatrix(progs, tokens).sum() / (N * (N-1)))
+
 
 if __name__ == '__main__':
     P1 = "def f1(x):\n  y = x+1\n  return y-1"
     P2 = "def f2(x):\n  y=x+1\n  y=y-1\n  return y"
-    print(f">>> {levdDistance(P1,P2)}")
+    print(f">>> {levenshteinDistance(P1,P2)}")
@@ -0,0 +1,129 @@
+#
+# Counting the execution steps of a piece of Python code, to stop it once it exceeds a 
+# budget of steps. Unlike a time-out, this cuts off a runaway function at the same point
+# on every machine, whatever its load. A step is the execution of (the start of) a line of
+# Python code, or a jump (e.g. to the next iteration of a loop). Code running inside C 
+# functions (e.g. sum() over a huge range) does not produce such events, so a wall-clock 
+# time-out is still needed as a last resort.
+#
+# On Python 3.12+ the events are obtained through sys.monitoring, which is cheap. On older
+# versions sys.settrace is used; this is slower, and it misses the jumps of a loop that 
+# stays within a single line (e.g. while True: pass). Moreover, Python removes a trace
+# function once it raises, so StepBudgetExceeded is then raised only once; code that
+# swallows it (e.g. a bare except-clause in a loop) is only stopped by the wall-clock
+# time-out, under which the step-limited test-cases are always run (see 
+# basicEvaluate.run_test_suite).
+#
+import os
+import sys
+import threading
+
+class StepBudgetExceeded(BaseException):
+    """
+    Raised when the code being counted exceeds its budget of steps. It is not an Exception,
+    so that it is not swallowed by the usual except-clauses in AI code. A bare except-clause
+    would still catch it; so (with sys.monitoring) it is raised again at every next step of 
+    the code, until the counter is exited. With sys.settrace it is raised once (see above).
+    """
+    pass
+
+# the code of the tool itself (in this directory) is not stopped:
+OWN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# the counter that is active in the current thread, if any:
+active = threading.local()
+lock = threading.Lock()
+# the number of counters active (over all threads); line-events are only monitored
+# when it is not zero:
+numOfActiveCounters = 0
+TOOL_ID = None
+TOOL_NAME = "llm4spi-step-counter"
+
+USE_MONITORING = hasattr(sys, "monitoring")
+
+def onLine(code, line_number):
+    counter = getattr(active, "counter", None)
+    if counter != None:
+        counter.step(code)
+
+def onJump(code, instruction_offset, destination_offset):
+    counter = getattr(active, "counter", None)
+    if counter != None:
+        counter.step(code)
+
+EVENTS = 0
+if USE_MONITORING:
+    EVENTS = sys.monitoring.events.LINE | sys.monitoring.events.JUMP
+
+def acquireMonitoring():
+    global TOOL_ID, numOfActiveCounters
+    with lock:
+        if TOOL_ID == None:
+            for toolId in [3, 4, 2, 1, 0, 5]:
+                if sys.monitoring.get_tool(toolId) == None:
+                    sys.monitoring.use_tool_id(toolId, TOOL_NAME)
+                    sys.monitoring.register_callback(toolId, sys.monitoring.events.LINE, onLine)
+                    sys.monitoring.register_callback(toolId, sys.monitoring.events.JUMP, onJump)
+                    TOOL_ID = toolId
+                    break
+            else:
+                raise RuntimeError("No free sys.monitoring tool id for counting steps.")
+        if numOfActiveCounters == 0:
+            sys.monitoring.set_events(TOOL_ID, EVENTS)
+        numOfActiveCounters += 1
+
+def releaseMonitoring():
+    global numOfActiveCounters
+    with lock:
+        numOfActiveCounters -= 1
+        if numOfActiveCounters == 0:
+            sys.monitoring.set_events(TOOL_ID, sys.monitoring.events.NO_EVENTS)
+
+
+class StepCounter:
+    """
+    A context manager that counts the steps of the code run (by the current thread) inside
+    it, and raises StepBudgetExceeded once there are more than maxSteps of them. Whether 
+    that happened is also kept in exceeded, as the exception may have been swallowed.
+    """
+    def __init__(self, maxSteps:int):
+        self.maxSteps = maxSteps
+        self.steps = 0
+        self.exceeded = False
+
+    def step(self, code):
+        if self.exceeded:
+            if not code.co_filename.startswith(OWN_DIR):
+                raise StepBudgetExceeded()
+            return
+        self.steps += 1
+        if self.steps > self.maxSteps:
+            self.exceeded = True
+            raise StepBudgetExceeded()
+
+    def traceCalls(self, frame, event, arg):
+        # sys.settrace variant: trace the lines of every frame. Note that an exception 
+        # from the tracer turns the tracing off.
+        return self.traceLines
+
+    def traceLines(self, frame, event, arg):
+        if event == "line":
+            self.step(frame.f_code)
+        return self.traceLines
+
+    def __enter__(self):
+        active.counter = self
+        if USE_MONITORING:
+            acquireMonitoring()
+        else:
+            self.previousTrace = sys.gettrace()
+            sys.settrace(self.traceCalls)
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        active.counter = None
+        if USE_MONITORING:
+            releaseMonitoring()
+        else:
+            sys.settrace(self.previousTrace)
+        return False
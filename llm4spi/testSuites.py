@@ -0,0 +1,156 @@
+#
+# The test-cases of a task's pre-/post-condition are given in the dataset as a string with
+# Python source code of a list. The list can be split into groups (test suites) by the token
+# '==='. The first group are the base0 tests, then (if there are three or more groups) the
+# base1 tests, and the rest are the validation tests.
+#
+# Evaluating and splitting these strings over and over is wasteful, so this module compiles
+# them once into already-split suites, and keeps them in a store next to the dataset. The
+# store is an SQLite database (see diskCache.py) with an entry per task and condition type,
+# so that a run only reads the suites of the tasks it needs, and only writes the ones it
+# had to compile. The consumers (basicEvaluate, datasetStats, checkDataSet) get their suites
+# from here.
+#
+from typing import Dict
+import hashlib
+import pickle
+
+from diskCache import PersistentCache
+
+SPLIT_TOKEN = '==='
+CONDTYPES = ["pre","post"]
+# to recognize store files of an older format:
+STORE_VERSION = 2
+# the stores are never evicted from:
+STORE_MAX_BYTES = float("inf")
+
+# the stores opened in this process, by their file:
+stores = {}
+
+# the compiled suites known in this process, by (task-id,condition-type):
+registry = {}
+
+
+def listSplit(s:list, sep): 
+    """
+    split the list s into segments which are separated by sep
+    """
+    segments = []
+    z = []
+    for x in s:
+        if x==sep:
+            segments.append(z)
+            z = []
+        else:
+            z.append(x)
+    segments.append(z)
+    return segments
+
+def compile_test_suites(testsSrc:str) -> Dict :
+    """
+    Evaluate the given string of test-cases and split it into suites. Returns a dictionary
+    with the suites base0, base1, and validation, and the number of groups the test-cases
+    were split into. If there are no tests, all suites are empty.
+    """
+    if testsSrc == None or testsSrc.strip() == "":
+        return { "base0" : [], "base1" : [], "validation" : [], "numOfGroups" : 0 }
+    test_cases0 = eval(testsSrc)
+    test_suites = listSplit(test_cases0,SPLIT_TOKEN)
+    suite_Base0 = test_suites[0]
+    suite_Base1 = []
+    suite_Validation = []
+    if len(test_suites) == 2:
+       suite_Validation = test_suites[1]
+    elif len(test_suites) > 2: 
+        suite_Base1 = test_suites[1]
+        for suite in test_suites[2:] : suite_Validation.extend(suite)
+    # else: should not happen... but if this does happen,
+    # then we simply have no validation suite
+    return { "base0" : suite_Base0, "base1" : suite_Base1, "validation" : suite_Validation, 
+             "numOfGroups" : len(test_suites) }
+
+def hash_tests(testsSrc:str) -> str :
+    return hashlib.sha256((testsSrc or "").encode("utf-8")).hexdigest()
+
+def register(Tid:str, condType:str, testsSrc:str, suites:Dict) :
+    registry[(Tid,condType)] = { "tests" : testsSrc, "suites" : suites }
+
+def forget_test_suites(tasks:Dict[str,Dict]) :
+    """
+    Drop the compiled suites of the given tasks from the registry, e.g. when these tasks
+    are done with and only some of a large dataset is kept in memory.
+    """
+    for Tid in tasks:
+        for condType in CONDTYPES:
+            registry.pop((Tid,condType), None)
+
+def get_test_suites(task:Dict, condType:str) -> Dict :
+    """
+    Return the compiled test suites of the pre- or post-condition (condType) of the task.
+    They are compiled if they are not known yet (or if the task's tests have changed).
+    """
+    testsSrc = task.get(f"{condType}_condition_tests")
+    entry = registry.get((task["task_id"],condType))
+    if entry == None or entry["tests"] != testsSrc:
+        register(task["task_id"], condType, testsSrc, compile_test_suites(testsSrc))
+        entry = registry[(task["task_id"],condType)]
+    return entry["suites"]
+
+def store_file(datafile:str) -> str :
+    return datafile + ".suites.sqlite"
+
+def open_suite_store(datafile:str) -> PersistentCache :
+    """
+    Return the store of compiled test suites of the given dataset; it is opened once per
+    process. Returns None if the store cannot be opened.
+    """
+    storefile = store_file(datafile)
+    if not storefile in stores:
+        try:
+            stores[storefile] = PersistentCache(storefile, STORE_MAX_BYTES, STORE_VERSION)
+        except Exception:
+            print(f">>> Could not open {storefile}; the test suites are not stored.")
+            stores[storefile] = None
+    return stores[storefile]
+
+def store_key(Tid:str, condType:str) -> str :
+    return f"{condType}:{Tid}"
+
+def load_suite_store(datafile:str, tasks:Dict[str,Dict]) :
+    """
+    Load the compiled test suites of the given tasks from the store next to the dataset
+    file, and make them available through get_test_suites. Tasks that are not in the 
+    store, or whose tests have changed, are compiled, and only these are written to
+    the store.
+    """
+    store = open_suite_store(datafile)
+    keys = [ store_key(Tid,condType) for Tid in tasks for condType in CONDTYPES ]
+    stored = {}
+    if store != None:
+        try:
+            stored = store.getMany(keys)
+        except Exception:
+            print(f">>> Could not read {store_file(datafile)}; the test suites are compiled again.")
+    new = {}
+    for Tid in tasks:
+        T = tasks[Tid]
+        for condType in CONDTYPES:
+            testsSrc = T.get(f"{condType}_condition_tests")
+            h = hash_tests(testsSrc)
+            key = store_key(Tid,condType)
+            entry = pickle.loads(stored[key]) if key in stored else None
+            if entry == None or entry["hash"] != h:
+                entry = { "hash" : h, "suites" : compile_test_suites(testsSrc) }
+                new[key] = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+            register(Tid, condType, testsSrc, entry["suites"])
+    if store != None and len(new) > 0:
+        try:
+            store.putMany(new)
+        except Exception:
+            print(f">>> Could not write {store_file(datafile)}; the test suites are not stored.")
+
+def all_test_cases(suites:Dict) -> list :
+    """
+    All test-cases of the given compiled suites, in their original order.
+    """
+    return suites["base0"] + suites["base1"] + suites["validation"]
@@ -0,0 +1,81 @@
+#
+# A persistent cache of the outcomes of running the test suites on AI candidates. Different
+# models and prompt types often come up with the same candidate for a task, and there is no 
+# need to run that candidate again in every experiment.
+#
+# An entry is identified by the fingerprint of the candidate's AST (see pythonSrcUtils.py), 
+# the hash of the reference solution and of the test-cases, and the settings that influence
+# the outcomes (the time-outs, the early exit, the execution mode with its step budget, the
+# resource limits of the sandbox, and whether None-predictions are ignored). The value is the
+# vector of outcome-codes (see verdicts.py) of every test suite.
+#
+# The cache is opt-in: it is only used when myconfig.VERDICT_CACHE_FILE is set.
+#
+import hashlib
+import json
+import os
+import numpy as np
+
+import myconfig
+import verdicts
+from diskCache import PersistentCache
+
+# the version of the format of the entries; entries of another version are dropped:
+SCHEMA_VERSION = 2
+
+# the cache is opened on first use (in every process that uses it):
+cache = None
+
+SUITES = [ "base0", "base1", "validationSuite" ]
+
+def getCache() -> PersistentCache :
+    """
+    Return the cache, or None if the cache is disabled (see myconfig.py).
+    """
+    global cache
+    if myconfig.VERDICT_CACHE_FILE == None: 
+        return None
+    if cache == None or cache.dbfile != myconfig.VERDICT_CACHE_FILE:
+        cacheDir = os.path.dirname(myconfig.VERDICT_CACHE_FILE)
+        if cacheDir != "": 
+            os.makedirs(cacheDir, exist_ok=True)
+        cache = PersistentCache(myconfig.VERDICT_CACHE_FILE, myconfig.VERDICT_CACHE_MAX_BYTES, SCHEMA_VERSION)
+    return cache
+
+def mkKey(candidateFingerprint:str, solutionSrc:str, testsSrc:str) -> str :
+    h = hashlib.sha256()
+    settings = (f"timeout={myconfig.RUN_SINGLE_TESTCASE_TIMEOUT};earlyExit={myconfig.EARLY_EXIT}"
+                f";adaptive={myconfig.ADAPTIVE_TIMEOUT},{myconfig.TIMEOUT_MULTIPLIER},{myconfig.TIMEOUT_FLOOR},{myconfig.TIMEOUT_CEILING}"
+                f";budget={myconfig.CANDIDATE_TIME_BUDGET}"
+                f";mode={myconfig.TEST_EXECUTION_MODE};steps={myconfig.STEP_BUDGET}"
+                f";limits={myconfig.CANDIDATE_MEMORY_LIMIT},{myconfig.CANDIDATE_CPU_LIMIT},{myconfig.CANDIDATE_MAX_OPEN_FILES}"
+                f";ignoreNone={myconfig.IGNORE_NONE_PREDICTION}")
+    for s in [candidateFingerprint, solutionSrc, testsSrc, settings]:
+        data = s.encode("utf-8")
+        # prefix every part with its length, so that different splits give different keys
+        h.update(len(data).to_bytes(8,"little"))
+        h.update(data)
+    return h.hexdigest()
+
+def lookup(candidateFingerprint:str, solutionSrc:str, testsSrc:str) -> dict :
+    """
+    Return the cached results (base0, base1, validationSuite) of the candidate with the
+    given fingerprint, or None if they are not in the cache.
+    """
+    C = getCache()
+    if C == None or candidateFingerprint == None: return None
+    value = C.get(mkKey(candidateFingerprint, solutionSrc, testsSrc))
+    if value == None: return None
+    codes = json.loads(value)
+    return { suite : verdicts.decode(np.frombuffer(bytes.fromhex(codes[suite]), dtype=np.int8)) 
+             for suite in SUITES }
+
+def store(candidateFingerprint:str, solutionSrc:str, testsSrc:str, results:dict) :
+    """
+    Put the results (base0, base1, validationSuite) of the candidate with the given 
+    fingerprint in the cache.
+    """
+    C = getCache()
+    if C == None or candidateFingerprint == None: return
+    codes = { suite : verdicts.encode(results[suite]).tobytes().hex() for suite in SUITES }
+    C.put(mkKey(candidateFingerprint, solutionSrc, testsSrc), json.dumps(codes).encode("utf-8"))
@@ -0,0 +1,150 @@
+#
+# Computing the verdicts of a task's candidates in one go. The results of running the
+# test-cases on the candidates are put in a NumPy matrix of outcome-codes, with a row per
+# candidate and a column per test-case (the columns of base0, then base1, then validation).
+# The verdicts (accepted, too_weak, too_strong, rejected, failed; see compare_results in
+# basicEvaluate.py) of all candidates on all suite-combinations are then calculated with 
+# array operations, rather than by comparing Python lists candidate by candidate.
+#
+from typing import Dict
+import numpy as np
+import myconfig
+from sandbox import FAILED_MEMORY, FAILED_CPU, FAILED_FILES
+
+# outcome-codes of a single test-case:
+FALSE   = 0
+TRUE    = 1
+NONE    = 2
+FAILED  = 3  # the test-case crashed or timed out
+NOTBOOL = 4  # the test-case returned something that is not a boolean
+SKIPPED = 5  # the test-case was not run (see VerdictTracker)
+# the test-case failed as it hit a resource limit (see sandbox.py):
+FAILED_MEMORY_LIMIT = 6
+FAILED_CPU_LIMIT    = 7
+FAILED_FILES_LIMIT  = 8
+
+# the verdicts; the code of a verdict is its index in this list:
+VERDICTS = [ "accepted", "too_weak", "too_strong", "rejected", "failed" ]
+ACCEPTED, TOO_WEAK, TOO_STRONG, REJECTED, VERDICT_FAILED = range(len(VERDICTS))
+
+def encode(results:list) -> np.ndarray :
+    """
+    Translate a list of test-results (True, False, None, "failed", "not a boolean value", etc.)
+    to a vector of outcome-codes.
+    """
+    def code(r):
+        if r is True  : return TRUE
+        if r is False : return FALSE
+        if r == None  : return NONE
+        if r == "failed" : return FAILED
+        if r == "skipped" : return SKIPPED
+        if r == FAILED_MEMORY : return FAILED_MEMORY_LIMIT
+        if r == FAILED_CPU    : return FAILED_CPU_LIMIT
+        if r == FAILED_FILES  : return FAILED_FILES_LIMIT
+        return NOTBOOL
+    return np.array([ code(r) for r in results ], dtype=np.int8)
+
+def decode(codes:np.ndarray) -> list :
+    """
+    The inverse of encode.
+    """
+    values = [ False, True, None, "failed", "not a boolean value", "skipped", FAILED_MEMORY, FAILED_CPU, FAILED_FILES ]
+    return [ values[c] for c in codes.tolist() ]
+
+def outcome_matrix(rows:list, numOfTests:int) -> np.ndarray :
+    """
+    Construct the outcome matrix from a list of test-result lists, one per candidate.
+    """
+    M = np.empty((len(rows), numOfTests), dtype=np.int8)
+    for i,results in enumerate(rows):
+        M[i,:] = encode(results)
+    return M
+
+def verdict_codes(expected:list, M:np.ndarray) -> np.ndarray :
+    """
+    Compare the expected results with every row of the outcome matrix M, and return the
+    verdict-code of each row. This gives the same verdicts as basicEvaluate.compare_results.
+    Skipped test-cases are left out of the comparison.
+    """
+    numOfCandidates = M.shape[0]
+    if not all(type(e) == bool for e in expected):
+        # the reference itself produced non-booleans; this is not expected, so we don't
+        # bother vectorizing, and fall back to comparing candidate by candidate:
+        from basicEvaluate import compare_results
+        def compare(row):
+            ran = row != SKIPPED
+            return compare_results([ e for (e,r) in zip(expected,ran) if r ], decode(row[ran]))
+        return np.array([ VERDICTS.index(compare(M[i])) for i in range(numOfCandidates) ], dtype=np.int8)
+    E = np.array(expected, dtype=bool)
+    considered = M != SKIPPED
+    if myconfig.IGNORE_NONE_PREDICTION:
+        considered &= M != NONE
+    failed = np.any(considered & (M > TRUE), axis=1)
+    falseNegative = np.any(considered & E & (M == FALSE), axis=1)
+    falsePositive = np.any(considered & ~E & (M == TRUE), axis=1)
+    if myconfig.IGNORE_NONE_PREDICTION:
+        # if all predictions are None, the verdict is "failed":
+        failed |= ~np.any(considered, axis=1)
+
+    V = np.full(numOfCandidates, ACCEPTED, dtype=np.int8)
+    V[falsePositive] = TOO_WEAK
+    V[falseNegative] = TOO_STRONG
+    V[falseNegative & falsePositive] = REJECTED
+    V[failed] = VERDICT_FAILED
+    return V
+
+def suite_verdicts(reference:Dict, M:np.ndarray) -> Dict[str,np.ndarray] :
+    """
+    Calculate the verdict-codes of all candidates for base0, allBases, validation, and all 
+    suites. The reference contains the results of the reference solution on base0, base1, 
+    and the validationSuite; the columns of M are ordered in the same way.
+    """
+    n0 = len(reference["base0"])
+    n1 = n0 + len(reference["base1"])
+    allExpected = reference["base0"] + reference["base1"] + reference["validationSuite"]
+    return {
+        "base0"      : verdict_codes(allExpected[:n0], M[:,:n0]),
+        "allBases"   : verdict_codes(allExpected[:n1], M[:,:n1]),
+        "validation" : verdict_codes(allExpected[n1:], M[:,n1:]),
+        "allsuites"  : verdict_codes(allExpected, M)
+    }
+
+def count(V:np.ndarray, verdict:int) -> int :
+    return int(np.count_nonzero(V == verdict))
+
+class VerdictTracker:
+    """
+    Follows the verdict of a candidate while its test-cases are being run, to tell when 
+    running more test-cases cannot change the verdict anymore. This is only so once the 
+    candidate failed a test-case (crashed, or returned a non-boolean): any other verdict,
+    even "rejected", still becomes "failed" if a later test-case fails.
+    The test-cases that are then not run are marked as "skipped".
+    """
+    def __init__(self, expected:list):
+        self.expected = expected
+        # if the reference's results are unusual, we don't stop early:
+        self.usable = all(type(e) == bool for e in expected)
+        self.position = 0
+        self.failed = False
+
+    def add(self, result) -> bool :
+        """
+        Add the result of the next test-case. Returns True if the verdict is now final.
+        """
+        self.position += 1
+        if result == None and myconfig.IGNORE_NONE_PREDICTION:
+            pass
+        elif type(result) != bool:
+            self.failed = True
+        return self.isFinal()
+
+    def isFinal(self) -> bool :
+        if not self.usable: return False
+        return self.failed
+
+    def skip(self, n:int) -> list :
+        """
+        Skip the next n test-cases; returns their results.
+        """
+        self.position += n
+        return [ "skipped" ] * n
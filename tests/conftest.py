@@ -0,0 +1,8 @@
+#
+# The modules of llm4spi import each other by their bare names, as when running from
+# the llm4spi directory.
+#
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "llm4spi"))
@@ -0,0 +1,80 @@
+#
+# Regression tests of the clustering of candidates (myconfig.CLUSTER_CANDIDATES): candidates
+# that behave the same on all test-cases must get the same verdicts as when they are run one
+# by one.
+#
+import pytest
+
+import myconfig
+import basicEvaluate
+
+SOLUTION = """def check_post_solution_CL0(r:int, x:int) -> bool :
+    return r == abs(x)"""
+
+TESTS = """[
+    [1, 1],
+    [1, -1],
+    [-1, -1],
+    [0, 0],
+    "===",
+    [2, 2],
+    [2, -2],
+    [3, -3],
+    "===",
+    [-2, 2],
+    [5, -5],
+    [0, 1],
+    [7, 7],
+    [-7, -7]
+]"""
+
+CANDIDATES = [
+    "return r == abs(x)",
+    "return r == (x if x >= 0 else -x)",
+    "return r == x",
+    "return r == max(x, -x)",
+    "return r >= 0",
+    "return r == (",
+    "return x == r",
+    "raise ValueError()",
+    # agrees with the solution on all test-cases, except [7,7]:
+    "return r == abs(x) and r != 7"
+]
+
+def results_of(task):
+    return [ { field : value for (field,value) in U.items() if field != "clusterOf" }
+             for U in task["post_condition_candidates_TestResults"] ]
+
+def summary_of(task):
+    return { field : value for (field,value) in task["post_condition_ResultsSummary"].items() if field != "clusters" }
+
+@pytest.fixture(autouse=True)
+def no_caches(monkeypatch):
+    monkeypatch.setattr(myconfig, "REFERENCE_RESULTS_CACHE_FILE", None)
+    monkeypatch.setattr(myconfig, "VERDICT_CACHE_FILE", None)
+    monkeypatch.setattr(myconfig, "DEDUPLICATE_CANDIDATES", False)
+
+@pytest.mark.parametrize("candidates,spotChecks", [
+    (CANDIDATES[:-1], myconfig.CLUSTER_SPOT_CHECKS),
+    # with spot checks on all the other test-cases, clustering is exact:
+    (CANDIDATES, 100)
+])
+def test_clustered_verdicts_are_the_unclustered_ones(monkeypatch, candidates, spotChecks):
+    monkeypatch.setattr(myconfig, "CLUSTER_SPOT_CHECKS", spotChecks)
+    results = {}
+    summaries = {}
+    for cluster in [False, True]:
+        monkeypatch.setattr(myconfig, "CLUSTER_CANDIDATES", cluster)
+        task = { "task_id" : "CL0",
+                 "post_condition_solution" : SOLUTION,
+                 "post_condition_incomplete" : "def check_post_CL0(r:int, x:int) -> bool :",
+                 "post_condition_tests" : TESTS,
+                 "post_condition_completions" : candidates }
+        basicEvaluate.evaluate_task_result(task, "post")
+        results[cluster] = results_of(task)
+        summaries[cluster] = summary_of(task)
+        if cluster:
+            clustered = [ U.get("clusterOf") for U in task["post_condition_candidates_TestResults"] ]
+            assert clustered[:4] == [ None, 0, None, 0 ]
+    assert results[True] == results[False]
+    assert summaries[True] == summaries[False]
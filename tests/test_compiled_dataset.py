@@ -0,0 +1,42 @@
+#
+# Regression tests of the compiled datasets (compiledDataset.py): a compiled file must not be
+# used in place of its json dataset once the dataset has changed, whatever the mtimes say.
+#
+import json
+import os
+
+import data
+from compiledDataset import compile_dataset, compiled_file
+
+def write_dataset(path, tasks, mtime_ns=None):
+    with open(path,'w') as fp:
+        json.dump(tasks, fp)
+    if mtime_ns != None:
+        os.utime(path, ns=(mtime_ns,mtime_ns))
+
+def task(Tid, desc):
+    return { "task_id" : Tid, "task_description" : desc }
+
+def test_compiled_dataset_is_used_while_up_to_date(tmp_path):
+    datafile = str(tmp_path / "tasks.json")
+    write_dataset(datafile, [ task("T0","a"), task("T1","b") ])
+    compile_dataset(datafile)
+    assert data.prefer_compiled(datafile) == compiled_file(datafile)
+    # touching the dataset does not change its content:
+    os.utime(datafile)
+    assert data.prefer_compiled(datafile) == compiled_file(datafile)
+    assert data.read_problems(datafile)["T1"]["task_description"] == "b"
+
+def test_changed_dataset_with_old_mtime_is_not_compiled(tmp_path):
+    datafile = str(tmp_path / "tasks.json")
+    write_dataset(datafile, [ task("T0","a"), task("T1","b") ])
+    compile_dataset(datafile)
+    mtime = os.stat(compiled_file(datafile)).st_mtime_ns - 10**9
+    # another size:
+    write_dataset(datafile, [ task("T0","a"), task("T1","bb") ], mtime)
+    assert data.prefer_compiled(datafile) == datafile
+    assert data.read_problems(datafile)["T1"]["task_description"] == "bb"
+    # the same size:
+    write_dataset(datafile, [ task("T0","a"), task("T1","c") ], mtime)
+    assert data.prefer_compiled(datafile) == datafile
+    assert data.read_problems(datafile)["T1"]["task_description"] == "c"
@@ -0,0 +1,61 @@
+#
+# Regression tests of the deduplication of candidates (myconfig.DEDUPLICATE_CANDIDATES): a
+# candidate that is the same as an earlier one must get the same results as when it is run.
+#
+import pytest
+
+import myconfig
+import basicEvaluate
+
+SOLUTION = """def check_post_solution_DD0(r:int, x:int) -> bool :
+    return r == abs(x)"""
+
+TESTS = """[
+    [1, 1],
+    [1, -1],
+    [-1, -1],
+    "===",
+    [0, 0],
+    "===",
+    [2, -2],
+    [-2, 2]
+]"""
+
+CANDIDATES = [
+    "return r == abs(x)",
+    "return r == x",
+    # the same as the first, modulo layout and comments:
+    "# the absolute value\nreturn r == abs( x )",
+    "return r == (",
+    "return r == x  ",
+    "return r == (",
+    "return r >= 0"
+]
+
+def results_of(task):
+    return [ { field : value for (field,value) in U.items() if field != "duplicateOf" }
+             for U in task["post_condition_candidates_TestResults"] ]
+
+@pytest.fixture(autouse=True)
+def no_caches(monkeypatch):
+    monkeypatch.setattr(myconfig, "REFERENCE_RESULTS_CACHE_FILE", None)
+    monkeypatch.setattr(myconfig, "VERDICT_CACHE_FILE", None)
+
+def test_duplicates_inherit_the_results_of_their_original(monkeypatch):
+    results = {}
+    for deduplicate in [False, True]:
+        monkeypatch.setattr(myconfig, "DEDUPLICATE_CANDIDATES", deduplicate)
+        task = { "task_id" : "DD0",
+                 "post_condition_solution" : SOLUTION,
+                 "post_condition_incomplete" : "def check_post_DD0(r:int, x:int) -> bool :",
+                 "post_condition_tests" : TESTS,
+                 "post_condition_completions" : CANDIDATES }
+        basicEvaluate.evaluate_task_result(task, "post")
+        results[deduplicate] = results_of(task)
+        if deduplicate:
+            duplicates = [ U.get("duplicateOf") for U in task["post_condition_candidates_TestResults"] ]
+            # (candidates that cannot be parsed have no fingerprint, and are not deduplicated)
+            assert duplicates == [ None, None, 0, None, 1, None, None ]
+    assert results[True] == results[False]
+    assert results[True][0]["allsuites-verdict"] == "accepted"
+    assert results[True][3]["def-loaded"] == "failed"
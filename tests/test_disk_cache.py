@@ -0,0 +1,36 @@
+#
+# Regression tests of the persistent cache (diskCache.py): the total size it keeps must
+# match the stored entries, without scanning all the entries on every put.
+#
+from diskCache import PersistentCache
+
+def stored_size(cache):
+    return cache.connection().execute("SELECT COALESCE(SUM(size),0) FROM entries").fetchone()[0]
+
+def test_total_size_follows_puts_and_evictions(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"), 100)
+    for k in range(30):
+        cache.put(f"key{k % 12}", bytes(k % 7 + 1))
+        cache.putMany({ f"many{k % 5}" : bytes(k % 9 + 1), f"key{k % 3}" : bytes(2) })
+        assert cache.totalSize() == stored_size(cache)
+        assert cache.totalSize() <= 100
+    cache.put("big", bytes(60))
+    assert cache.totalSize() == stored_size(cache) <= 100
+    assert cache.get("big") == bytes(60)
+
+def test_total_size_survives_reopening(tmp_path):
+    dbfile = str(tmp_path / "cache.sqlite")
+    cache = PersistentCache(dbfile, 1000)
+    cache.putMany({ "a" : bytes(10), "b" : bytes(20) })
+    assert PersistentCache(dbfile, 1000).totalSize() == 30
+    # another schema version discards the entries, and their size:
+    assert PersistentCache(dbfile, 1000, schemaVersion=2).totalSize() == 0
+
+def test_put_does_not_scan_the_entries(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"), 1000)
+    statements = []
+    cache.connection().set_trace_callback(statements.append)
+    for k in range(10):
+        cache.put(f"key{k}", bytes(10))
+    cache.putMany({ "a" : bytes(10), "b" : bytes(20) })
+    assert not any("SUM(" in S.upper() or "ORDER BY" in S.upper() for S in statements)
@@ -0,0 +1,59 @@
+#
+# Regression tests of the early exit (myconfig.EARLY_EXIT): skipping the test-cases that
+# cannot change a candidate's verdict must not change the verdict.
+#
+import pytest
+
+import myconfig
+import basicEvaluate
+
+SOLUTION = """def check_post_solution_EE0(r:bool, x:int) -> bool :
+    return r == (x > 0)"""
+
+# the candidate has a false positive and a false negative in the first test-cases, and
+# crashes on a later one:
+REJECTED_THEN_CRASHES = """    if x == 99:
+        raise ValueError()
+    return r != (x > 0)"""
+
+TESTS = """[
+    [True, 1],
+    [False, 1],
+    [True, 2],
+    [True, 99],
+    "===",
+    [False, 3],
+    "===",
+    [True, 4],
+    [False, 4],
+    [True, 99]
+]"""
+
+def mk_task(completions):
+    return { "task_id" : "EE0",
+             "post_condition_solution" : SOLUTION,
+             "post_condition_incomplete" : "def check_post_EE0(r:bool, x:int) -> bool :",
+             "post_condition_tests" : TESTS,
+             "post_condition_completions" : completions }
+
+def verdicts_of(task):
+    return [ { field : U.get(field) for field in ["base0-verdict","allBases-verdict","validation-verdict","allsuites-verdict"] }
+             for U in task["post_condition_candidates_TestResults"] ]
+
+@pytest.fixture(autouse=True)
+def no_caches(monkeypatch):
+    monkeypatch.setattr(myconfig, "REFERENCE_RESULTS_CACHE_FILE", None)
+    monkeypatch.setattr(myconfig, "VERDICT_CACHE_FILE", None)
+
+@pytest.mark.parametrize("mode", ["signal", "thread"])
+def test_early_exit_keeps_the_verdicts(monkeypatch, mode):
+    monkeypatch.setattr(myconfig, "TEST_EXECUTION_MODE", mode)
+    results = {}
+    for earlyExit in [False, True]:
+        monkeypatch.setattr(myconfig, "EARLY_EXIT", earlyExit)
+        task = mk_task([REJECTED_THEN_CRASHES, "    return r == (x > 0)"])
+        basicEvaluate.evaluate_task_result(task, "post")
+        results[earlyExit] = verdicts_of(task)
+    assert results[True] == results[False]
+    assert results[True][0]["base0-verdict"] == "failed"
+    assert results[True][1]["allsuites-verdict"] == "accepted"
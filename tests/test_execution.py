@@ -0,0 +1,91 @@
+#
+# Regression tests of running test-cases on AI candidates (basicEvaluate.run_test_suite):
+# a candidate that crashes, hangs, or tries to dodge its time-out, gives "failed", and
+# does not take the evaluation down with it.
+#
+import time
+import pytest
+
+import myconfig
+import basicEvaluate
+from basicEvaluate import load_function, run_test_suite
+
+EXITS = """
+def check_exits(x):
+    raise SystemExit(1)
+"""
+
+INTERRUPTS = """
+def check_interrupts(x):
+    raise KeyboardInterrupt()
+"""
+
+SWALLOWS_TIMEOUT = """
+def check_swallows(x):
+    while True:
+        try:
+            x = x + 1
+        except:
+            pass
+"""
+
+SWALLOWS_TIMEOUT_NESTED = """
+def check_swallows_nested(x):
+    while True:
+        try:
+            try:
+                x = x + 1
+            except:
+                pass
+        except:
+            pass
+"""
+
+RETURNS = """
+def check_returns(x):
+    return x > 0
+"""
+
+@pytest.fixture
+def mode(request, monkeypatch):
+    monkeypatch.setattr(myconfig, "TEST_EXECUTION_MODE", request.param)
+    return request.param
+
+def run(src, fname, suite, timeout=0.2):
+    t0 = time.perf_counter()
+    results = run_test_suite(load_function(src, fname), suite, timeout=timeout)
+    return (results, time.perf_counter() - t0)
+
+@pytest.mark.parametrize("mode", ["signal", "thread", "steps"], indirect=True)
+@pytest.mark.parametrize("src,fname", [(EXITS, "check_exits"), (INTERRUPTS, "check_interrupts")])
+def test_candidate_raising_base_exception_fails(mode, src, fname):
+    (results, _) = run(src, fname, [[1],[2]])
+    assert results == ["failed", "failed"]
+
+@pytest.mark.parametrize("mode", ["signal", "steps"], indirect=True)
+@pytest.mark.parametrize("src,fname", [(SWALLOWS_TIMEOUT, "check_swallows"), 
+                                       (SWALLOWS_TIMEOUT_NESTED, "check_swallows_nested")])
+def test_candidate_swallowing_timeout_is_stopped(mode, src, fname):
+    (results, duration) = run(src, fname, [[1],[2]])
+    assert results == ["failed", "failed"]
+    assert duration < 5
+
+@pytest.mark.parametrize("mode", ["signal", "steps"], indirect=True)
+def test_tracing_is_restored_after_timeout(mode):
+    run(SWALLOWS_TIMEOUT, "check_swallows", [[1]])
+    (results, _) = run(RETURNS, "check_returns", [[1],[-1]])
+    assert results == [True, False]
+    assert basicEvaluate.sys.gettrace() == None
+
+def test_steps_mode_stops_candidate_swallowing_step_budget(monkeypatch):
+    # with sys.settrace (Python < 3.12) StepBudgetExceeded is raised only once; the candidate
+    # then runs on till the time-out stops it
+    # (whether the budget runs out inside the try-block depends on the budget; some of these do)
+    monkeypatch.setattr(myconfig, "TEST_EXECUTION_MODE", "steps")
+    for budget in range(1000,1004):
+        monkeypatch.setattr(myconfig, "STEP_BUDGET", budget)
+        (results, duration) = run(SWALLOWS_TIMEOUT, "check_swallows", [[1]], timeout=0.5)
+        assert results == ["failed"]
+        assert duration < 5
+    (results, _) = run(RETURNS, "check_returns", [[1],[-1]], timeout=0.5)
+    assert results == [True, False]
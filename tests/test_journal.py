@@ -0,0 +1,38 @@
+#
+# Regression tests of resuming an experiment from its journal (journal.py), in particular
+# from a journal whose last line was cut off when the run was killed.
+#
+from journal import ExperimentJournal
+
+HEADER = { "dataset" : "mini.json", "model" : "fake" }
+
+def generated(Tid, completion):
+    return { "task_id" : Tid, "post_condition_completions" : [ completion ] }
+
+def test_resume_from_truncated_line(tmp_path):
+    filename = str(tmp_path / "run.journal.jsonl")
+    J = ExperimentJournal(filename, HEADER)
+    J.recordGeneration(generated("T0", "a"))
+    J.recordGeneration(generated("T1", "b"))
+    # the run is killed while writing the record of T1:
+    with open(filename,'rb') as fp:
+        content = fp.read()
+    with open(filename,'wb') as fp:
+        fp.write(content[:-10])
+
+    J = ExperimentJournal(filename, HEADER, resume=True)
+    assert list(J.generated) == [ "T0" ]
+    # T1 is generated again; its record must not be glued to the partial line:
+    J.recordGeneration(generated("T1", "c"))
+    J = ExperimentJournal(filename, HEADER, resume=True)
+    assert list(J.generated) == [ "T0", "T1" ]
+    task = { "task_id" : "T1" }
+    assert J.restoreGeneration(task)
+    assert task["post_condition_completions"] == [ "c" ]
+
+def test_journal_of_another_run_is_started_anew(tmp_path):
+    filename = str(tmp_path / "run.journal.jsonl")
+    J = ExperimentJournal(filename, HEADER)
+    J.recordGeneration(generated("T0", "a"))
+    J = ExperimentJournal(filename, { **HEADER, "model" : "other" }, resume=True)
+    assert len(J.generated) == 0
@@ -0,0 +1,62 @@
+#
+# Regression tests of the pipelined generate-then-evaluate mode
+# (openai4spi.generate_and_evaluate_pipelined).
+#
+import os
+import threading
+import time
+import pytest
+
+import data
+import openai4spi
+from openai4spi import PromptResponder, generate_and_evaluate_pipelined
+
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mini.json")
+
+class FakeAI(PromptResponder):
+    def __init__(self):
+        PromptResponder.__init__(self)
+        self.model = "fake"
+
+    def completeIt(self, multipleAnswer:int, prompt:str) -> list[str] :
+        return [ "```python\ndef f(x):\n    return True\n```" ] * multipleAnswer
+
+def run_pipeline(tasks, timeout=30, **kw):
+    """
+    Run the pipeline in a thread; returns the exception it raised, or None. Fails the
+    test if the pipeline does not finish within the time-out.
+    """
+    outcome = {}
+    def run():
+        try:
+            generate_and_evaluate_pipelined(FakeAI(), tasks, 1, "usePrgDesc", **kw)
+            outcome["exception"] = None
+        except Exception as e:
+            outcome["exception"] = e
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    t.join(timeout)
+    assert not t.is_alive(), "the pipeline hangs"
+    return outcome["exception"]
+
+def test_tasks_are_reported_in_order(monkeypatch):
+    tasks = data.read_problems(DATASET)
+    first = list(tasks)[0]
+    def slowFirst(task, condition):
+        # the first task takes the longest, so the other workers finish theirs before it:
+        if task["task_id"] == first: time.sleep(0.5)
+    monkeypatch.setattr(openai4spi, "evaluate_task_result", slowFirst)
+    reported = []
+    exception = run_pipeline(tasks, maxConcurrency=4, queueSize=4, numOfEvaluationWorkers=3,
+                             onTaskEvaluated=lambda task: reported.append(task["task_id"]))
+    assert exception == None
+    assert reported == list(tasks)
+
+@pytest.mark.parametrize("numOfEvaluationWorkers", [1, 3])
+def test_failing_evaluation_is_raised(monkeypatch, numOfEvaluationWorkers):
+    tasks = data.read_problems(DATASET)
+    def crash(task, condition):
+        raise RuntimeError("evaluation crashed")
+    monkeypatch.setattr(openai4spi, "evaluate_task_result", crash)
+    exception = run_pipeline(tasks, maxConcurrency=1, queueSize=1, numOfEvaluationWorkers=numOfEvaluationWorkers)
+    assert isinstance(exception, RuntimeError)
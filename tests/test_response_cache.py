@@ -0,0 +1,31 @@
+#
+# Regression tests of the cache of LLM responses (responseCache.py): a cached run must give
+# the same answers, at the same positions, as an uncached one.
+#
+from openai4spi import PromptResponder
+from responseCache import CachingResponder
+
+class FakeAI(PromptResponder):
+    def __init__(self, answers):
+        PromptResponder.__init__(self)
+        self.model = "fake"
+        self.answers = answers
+        self.asked = []
+
+    def completeIt(self, multipleAnswer:int, prompt:str) -> list[str] :
+        self.asked.append(multipleAnswer)
+        return self.answers[:multipleAnswer]
+
+def test_none_answers_keep_their_position(tmp_path):
+    AI = FakeAI([ "a", None, "c" ])
+    responder = CachingResponder(AI, str(tmp_path / "responses.sqlite"))
+    assert responder.completeIt(3, "prompt") == AI.completeIt(3, "prompt")
+    # the None answer is not cached, so it is asked again:
+    AI.answers = [ "b" ]
+    assert responder.completeIt(3, "prompt") == [ "a", "b", "c" ]
+    assert AI.asked[-1] == 1
+
+def test_missing_answers_are_none(tmp_path):
+    AI = FakeAI([ "a" ])
+    responder = CachingResponder(AI, str(tmp_path / "responses.sqlite"))
+    assert responder.completeIt(2, "prompt") == [ "a", None ]
@@ -0,0 +1,63 @@
+#
+# Regression tests of the subprocess execution mode (sandbox.py): candidates must get the
+# same verdicts as in the other execution modes.
+#
+import pickle
+import pytest
+
+import myconfig
+import basicEvaluate
+import sandbox
+
+# the reference solution imports math; the candidates can use it, as it is in their namespace:
+SOLUTION = """import math
+def check_post_solution_SB0(r:float, x:float) -> bool :
+    return r == math.sqrt(x)"""
+
+TESTS = """[
+    [2.0, 4.0],
+    [3.0, 4.0],
+    "===",
+    [3.0, 9.0],
+    [1.0, 9.0]
+]"""
+
+CANDIDATES = [
+    "    return r == math.sqrt(x)",
+    "    return r * r == x",
+    "    return r == sqrt(x)"
+]
+
+def verdicts_of(task):
+    return [ { field : U.get(field) for field in ["base0","base1","validationSuite","allsuites-verdict"] }
+             for U in task["post_condition_candidates_TestResults"] ]
+
+@pytest.fixture(autouse=True)
+def no_caches(monkeypatch):
+    monkeypatch.setattr(myconfig, "REFERENCE_RESULTS_CACHE_FILE", None)
+    monkeypatch.setattr(myconfig, "VERDICT_CACHE_FILE", None)
+
+def test_subprocess_mode_gives_the_same_verdicts(monkeypatch):
+    results = {}
+    for mode in ["signal", "subprocess"]:
+        monkeypatch.setattr(myconfig, "TEST_EXECUTION_MODE", mode)
+        task = { "task_id" : "SB0",
+                 "post_condition_solution" : SOLUTION,
+                 "post_condition_incomplete" : "def check_post_SB0(r:float, x:float) -> bool :",
+                 "post_condition_tests" : TESTS,
+                 "post_condition_completions" : CANDIDATES }
+        basicEvaluate.evaluate_task_result(task, "post")
+        results[mode] = verdicts_of(task)
+    assert results["subprocess"] == results["signal"]
+    assert results["subprocess"][0]["allsuites-verdict"] == "accepted"
+
+def test_function_that_cannot_be_defined_fails_without_killing_the_worker():
+    fnBytes = pickle.dumps(("definitions", (("raise ValueError()", "f"),)))
+    box = sandbox.Sandbox()
+    try:
+        assert box.run(fnBytes, [1], 10) == "failed"
+        process = box.process
+        assert box.run(fnBytes, [2], 10) == "failed"
+        assert box.process is process
+    finally:
+        box.kill()
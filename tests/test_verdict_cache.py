@@ -0,0 +1,29 @@
+#
+# Regression tests of the keys of the cache of candidate verdicts (verdictCache.py): every
+# setting that can change a verdict must change the key.
+#
+import pytest
+
+import myconfig
+import verdictCache
+
+def key():
+    return verdictCache.mkKey("fingerprint", "def f(x): return True", "[[1]]")
+
+@pytest.mark.parametrize("setting,value", [
+    ("IGNORE_NONE_PREDICTION", not myconfig.IGNORE_NONE_PREDICTION),
+    ("TEST_EXECUTION_MODE", "subprocess"),
+    ("TEST_EXECUTION_MODE", "steps"),
+    ("STEP_BUDGET", 1000),
+    ("CANDIDATE_MEMORY_LIMIT", 256 * 1024 * 1024),
+    ("CANDIDATE_CPU_LIMIT", 1),
+    ("CANDIDATE_MAX_OPEN_FILES", 8)
+])
+def test_key_depends_on_setting(monkeypatch, setting, value):
+    before = key()
+    monkeypatch.setattr(myconfig, setting, value)
+    assert key() != before
+
+def test_cache_is_opt_in():
+    assert myconfig.VERDICT_CACHE_FILE == None
+    assert verdictCache.getCache() == None